@@ -25,6 +25,7 @@ from app.models import base
 from app.models import users
 from app.models import goals
 from app.models import workouts
+from app.models import workout_rollups
 
 target_metadata = base.Base.metadata
 
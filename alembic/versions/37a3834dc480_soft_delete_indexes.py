@@ -0,0 +1,76 @@
+"""soft delete indexes
+
+Revision ID: 37a3834dc480
+Revises: 9e95bb74e395
+Create Date: 2026-10-18 13:51:36.670942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '37a3834dc480'
+down_revision: Union[str, None] = '9e95bb74e395'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NOT_DELETED = {
+    "sqlite_where": sa.text("is_deleted = 0"),
+    "postgresql_where": sa.text("is_deleted = false"),
+}
+NOT_NOTIFIED = {
+    "sqlite_where": sa.text("is_deleted = 0 AND is_notified = 0"),
+    "postgresql_where": sa.text("is_deleted = false AND is_notified = false"),
+}
+ACTIVE = {
+    "sqlite_where": sa.text("is_deleted = 0 AND is_active = 1"),
+    "postgresql_where": sa.text("is_deleted = false AND is_active = true"),
+}
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_goal_user_id_created_at",
+        "goal",
+        ["user_id", "created_at", "id"],
+        unique=False,
+        **NOT_DELETED,
+    )
+    op.create_index(
+        "ix_goal_user_id_not_notified", "goal", ["user_id"], unique=False, **NOT_NOTIFIED
+    )
+    op.create_index("ix_user_active", "user", ["id"], unique=False, **ACTIVE)
+    op.create_index(
+        "ix_workout_goal_id",
+        "workout",
+        ["goal_id", "calories_burned"],
+        unique=False,
+        **NOT_DELETED,
+    )
+    op.create_index(
+        "ix_workout_user_id_created_at",
+        "workout",
+        ["user_id", "created_at", "id"],
+        unique=False,
+        **NOT_DELETED,
+    )
+    op.create_index(
+        "ix_workout_user_id_exercise_created_at",
+        "workout",
+        ["user_id", "exercise", "created_at", "id"],
+        unique=False,
+        **NOT_DELETED,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_workout_user_id_exercise_created_at", table_name="workout")
+    op.drop_index("ix_workout_user_id_created_at", table_name="workout")
+    op.drop_index("ix_workout_goal_id", table_name="workout")
+    op.drop_index("ix_user_active", table_name="user")
+    op.drop_index("ix_goal_user_id_not_notified", table_name="goal")
+    op.drop_index("ix_goal_user_id_created_at", table_name="goal")
@@ -0,0 +1,62 @@
+"""goal progress counters
+
+Revision ID: 90c1ecebb9ec
+Revises: 37a3834dc480
+Create Date: 2026-10-18 13:52:54.937512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '90c1ecebb9ec'
+down_revision: Union[str, None] = '37a3834dc480'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "goal",
+        sa.Column("calories_progress", sa.Float(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "goal",
+        sa.Column("duration_progress", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # backfill the counters from the workouts already logged against each goal
+    goal = sa.table(
+        "goal",
+        sa.column("id"),
+        sa.column("calories_progress"),
+        sa.column("duration_progress"),
+    )
+    workout = sa.table(
+        "workout",
+        sa.column("goal_id"),
+        sa.column("calories_burned"),
+        sa.column("duration"),
+        sa.column("is_deleted", sa.Boolean()),
+    )
+    workouts = sa.select(workout).where(
+        workout.c.goal_id == goal.c.id, workout.c.is_deleted == sa.false()
+    )
+    op.execute(
+        goal.update().values(
+            calories_progress=workouts.with_only_columns(
+                sa.func.coalesce(sa.func.sum(workout.c.calories_burned), 0)
+            ).scalar_subquery(),
+            duration_progress=workouts.with_only_columns(
+                sa.func.coalesce(sa.func.sum(workout.c.duration), 0)
+            ).scalar_subquery(),
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("goal", "duration_progress")
+    op.drop_column("goal", "calories_progress")
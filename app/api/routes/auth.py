@@ -2,7 +2,6 @@ from typing import Annotated
 
 from fastapi import Depends, status
 from fastapi.exceptions import HTTPException
-from fastapi.responses import JSONResponse
 from fastapi.routing import APIRouter
 
 from app.crud import users as user_crud
@@ -20,12 +19,13 @@ from app.dependencies import (
 from app.schemas.auth import TokenRefresh
 from app.schemas.base import AppResponse
 from app.schemas.users import UserCreate, UserPublic
+from app.utils.responses import AppJSONResponse
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/signup")
-async def user_signup(session: SessionDep, user_in: UserCreate) -> AppResponse:
+@router.post("/signup", response_model=AppResponse)
+async def user_signup(session: SessionDep, user_in: UserCreate) -> AppJSONResponse:
     user = await user_crud.get_user_by_email(session, user_in.email)
     if user is not None:
         raise HTTPException(
@@ -34,14 +34,16 @@ async def user_signup(session: SessionDep, user_in: UserCreate) -> AppResponse:
         )
 
     user = await user_crud.create_user(session=session, user_create=user_in)
-    return AppResponse(message="Created successfully", status=status.HTTP_201_CREATED)
+    return AppJSONResponse(
+        AppResponse(message="Created successfully", status=status.HTTP_201_CREATED)
+    )
 
 
 @router.post("/login")
 async def user_login(
     session: SessionDep,
     form_data: Annotated[PublicOAuth2PasswordRequestForm, Depends()],
-) -> JSONResponse:
+) -> AppJSONResponse:
     user = await user_crud.authenticate(
         session=session, email=form_data.email, password=form_data.password
     )
@@ -56,9 +58,9 @@ async def user_login(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user"
         )
 
-    return JSONResponse(
+    return AppJSONResponse(
         content={
-            "data": UserPublic.model_validate(user).model_dump(mode="json"),
+            "data": UserPublic.model_validate(user),
             "access_token": create_access_token(user.email),
             "refresh_token": create_refresh_token(user.email),
         },
@@ -69,7 +71,7 @@ async def user_login(
 @router.post("/refresh")
 async def refresh_token(
     current_user: CurrentUser, refresh_token: TokenRefresh
-) -> JSONResponse:
+) -> AppJSONResponse:
     if not refresh_token.refresh:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="No refresh token"
@@ -82,4 +84,6 @@ async def refresh_token(
         )
 
     access_token = create_access_token(current_user.email)
-    return JSONResponse({"access_token": access_token}, status_code=status.HTTP_200_OK)
+    return AppJSONResponse(
+        {"access_token": access_token}, status_code=status.HTTP_200_OK
+    )
@@ -5,45 +5,57 @@ from fastapi.routing import APIRouter
 from fastapi.exceptions import HTTPException
 from pydantic.types import UUID4
 
-from app.dependencies import CurrentUser, SessionDep
+from app.dependencies import (
+    CurrentUser,
+    ReadSessionDep,
+    SessionDep,
+)
 from app.schemas.base import AppPaginatedResponse, AppResponse, PaginationQuery
 from app.crud import goals as goal_crud
-from app.schemas.goals import GoalCreate, GoalPublic, GoalUpdate
+from app.schemas.goals import GoalCreate, GoalUpdate, GoalWithProgress
+from app.utils.responses import AppJSONResponse
 
 
 router = APIRouter(prefix="/goals", tags=["goals"])
 
 
-@router.get("/")
+@router.get("/", response_model=AppPaginatedResponse[GoalWithProgress])
 async def get_all_goals(
-    session: SessionDep, user: CurrentUser, query: Annotated[PaginationQuery, Query()]
-) -> AppPaginatedResponse[GoalPublic]:
-    goals = await goal_crud.get_all_paginated_goals(session, user, query.page, query.limit)
-    total = await goal_crud.total_goals(session, user)
-    return AppPaginatedResponse(
-        result=[GoalPublic.model_validate(goal) for goal in goals],
-        page=query.page,
-        limit=query.limit,
-        total=total,
-        status=status.HTTP_200_OK,
+    session: ReadSessionDep,
+    user: CurrentUser,
+    query: Annotated[PaginationQuery, Query()],
+) -> AppJSONResponse:
+    # not cached: the projected completion moves with the current time
+    goals = await goal_crud.get_all_paginated_goals(
+        session, user, query.page, query.limit, query.cursor, query.include_total
+    )
+    return AppJSONResponse(
+        AppPaginatedResponse[GoalWithProgress](
+            result=goals.items,
+            page=query.page,
+            limit=query.limit,
+            total=goals.total,
+            status=status.HTTP_200_OK,
+            next_cursor=goals.next_cursor,
+            prev_cursor=goals.prev_cursor,
+        )
     )
 
 
-@router.post("/")
+@router.post("/", response_model=AppResponse)
 async def create_goal(
     session: SessionDep, user: CurrentUser, goal_data: GoalCreate
-) -> AppResponse:
+) -> AppJSONResponse:
     await goal_crud.create_goal(session, user, goal_data)
-    return AppResponse(
-        message="Created Successfully",
-        status=status.HTTP_201_CREATED,
+    return AppJSONResponse(
+        AppResponse(message="Created Successfully", status=status.HTTP_201_CREATED)
     )
 
 
-@router.patch("/{goal_id}")
+@router.patch("/{goal_id}", response_model=AppResponse)
 async def update_goal(
     session: SessionDep, user: CurrentUser, goal_id: UUID4, goal_data: GoalUpdate
-) -> AppResponse:
+) -> AppJSONResponse:
     goal = await goal_crud.get_goal_by_id(session, user, goal_id)
     if goal is None:
         raise HTTPException(
@@ -54,9 +66,8 @@ async def update_goal(
         )
 
     await goal_crud.update_goal(session, goal, goal_data)
-    return AppResponse(
-        message="Updated Successfully",
-        status=status.HTTP_200_OK,
+    return AppJSONResponse(
+        AppResponse(message="Updated Successfully", status=status.HTTP_200_OK)
     )
 
 
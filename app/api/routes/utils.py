@@ -1,13 +1,46 @@
-from fastapi import APIRouter, status
+import logging
 
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+from redis.exceptions import RedisError
+
+from app.core.redis import get_async_redis
+from app.dependencies import authenticate_swagger
 from app.schemas.base import AppResponse
+from app.utils import metrics
+from app.utils.responses import AppJSONResponse
+
+logger = logging.getLogger(__name__)
 
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
 
-@router.get("/health-check")
-async def health_check() -> AppResponse[bool]:
-    return AppResponse(
-        data=True, message="Health is good 😃️", status=status.HTTP_200_OK
+@router.get("/health-check", response_model=AppResponse[bool])
+async def health_check() -> AppJSONResponse:
+    return AppJSONResponse(
+        AppResponse(
+            data=True, message="Health is good 😃️", status=status.HTTP_200_OK
+        )
+    )
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(authenticate_swagger)],
+)
+async def get_metrics() -> PlainTextResponse:
+    """Metrics in the Prometheus text format, summed over every process."""
+    redis = get_async_redis()
+    try:
+        # push first, so the totals include everything this process counted
+        await metrics.apush_metrics(redis)
+        shared = await metrics.get_shared_values(redis)
+    except RedisError:
+        logger.warning("Shared metrics unavailable", exc_info=True)
+        shared = None
+
+    return PlainTextResponse(
+        metrics.render(shared), media_type="text/plain; version=0.0.4"
     )
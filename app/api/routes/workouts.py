@@ -1,46 +1,134 @@
 from typing import Annotated
 
-from fastapi import Query, status
+from fastapi import Query, Request, Response, status
 from fastapi.routing import APIRouter
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from pydantic.types import UUID4
 
-from app.dependencies import CurrentUser, SessionDep
+from app.core.config import settings
+from app.core.database import aget_read_db
+from app.dependencies import (
+    CurrentUser,
+    ReadSessionDep,
+    ResponseCacheDep,
+    SessionDep,
+)
 from app.schemas.base import AppPaginatedResponse, AppResponse
 from app.schemas.workouts import (
+    WorkoutBulkResult,
     WorkoutCreate,
+    WorkoutExportQuery,
     WorkoutPublic,
     WorkoutQuery,
+    WorkoutStats,
+    WorkoutStatsQuery,
     WorkoutUpdate,
 )
 from app.crud import workouts as workout_crud
 from app.crud import goals as goal_crud
+from app.crud import workout_rollups as rollup_crud
+from app.utils.bulk import NDJSON_MEDIA_TYPE, InvalidItem, read_json_items
+from app.utils.export import iter_csv, iter_ndjson
+from app.utils.responses import AppJSONResponse
 
 
 router = APIRouter(prefix="/workouts", tags=["workouts"])
 
 
-@router.get("/")
+@router.get("/", response_model=AppPaginatedResponse[WorkoutPublic])
 async def get_all_workouts(
-    session: SessionDep, user: CurrentUser, query: Annotated[WorkoutQuery, Query()]
-) -> AppPaginatedResponse[WorkoutPublic]:
+    session: ReadSessionDep,
+    user: CurrentUser,
+    cache: ResponseCacheDep,
+    query: Annotated[WorkoutQuery, Query()],
+) -> Response:
+    if cached := await cache.lookup():
+        return cached
+
     workouts = await workout_crud.get_all_workouts(
-        session, user, query.page, query.limit, query.exercise
+        session,
+        user,
+        query.page,
+        query.limit,
+        query.exercise,
+        query.cursor,
+        query.include_total,
+    )
+    return await cache.respond(
+        AppPaginatedResponse[WorkoutPublic](
+            result=workouts.items,
+            page=query.page,
+            limit=query.limit,
+            total=workouts.total,
+            status=status.HTTP_200_OK,
+            next_cursor=workouts.next_cursor,
+            prev_cursor=workouts.prev_cursor,
+        )
+    )
+
+
+@router.get("/stats", response_model=AppResponse[list[WorkoutStats]])
+async def get_workout_stats(
+    session: ReadSessionDep,
+    user: CurrentUser,
+    query: Annotated[WorkoutStatsQuery, Query()],
+) -> AppJSONResponse:
+    stats = await rollup_crud.get_workout_stats(
+        session, user, query.period, query.exercise, query.start_date, query.end_date
     )
-    total = await workout_crud.total_workouts(session, user)
-    return AppPaginatedResponse(
-        result=[WorkoutPublic.model_validate(workout) for workout in workouts],
-        page=query.page,
-        limit=query.limit,
-        total=total,
-        status=status.HTTP_200_OK,
+    return AppJSONResponse(
+        AppResponse[list[WorkoutStats]](data=stats, status=status.HTTP_200_OK)
     )
 
 
-@router.get("/{workout_id}")
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/csv": {}, NDJSON_MEDIA_TYPE: {}}},
+    },
+)
+async def export_workouts(
+    user: CurrentUser, query: Annotated[WorkoutExportQuery, Query()]
+) -> StreamingResponse:
+    """Stream the user's whole workout history as CSV or NDJSON."""
+
+    # the export outlives the request's dependencies, so it has its own session
+    async def stream_rows():
+        async for session in aget_read_db(user.id):
+            rows = workout_crud.stream_workouts(
+                session, user, query.exercise, query.start_date, query.end_date
+            )
+            async for row in rows:
+                yield row
+
+    if query.format == "ndjson":
+        content, media_type = iter_ndjson(stream_rows()), NDJSON_MEDIA_TYPE
+    else:
+        header = [column.key for column in workout_crud.EXPORT_COLUMNS]
+        content, media_type = iter_csv(stream_rows(), header), "text/csv"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="workouts.{query.format}"'
+        },
+    )
+
+
+@router.get("/{workout_id}", response_model=AppResponse[WorkoutPublic])
 async def get_workout(
-    session: SessionDep, user: CurrentUser, workout_id: UUID4
-) -> AppResponse[WorkoutPublic]:
+    session: ReadSessionDep,
+    user: CurrentUser,
+    cache: ResponseCacheDep,
+    workout_id: UUID4,
+) -> Response:
+    if cached := await cache.lookup():
+        return cached
+
     workout = await workout_crud.get_workout(session, user, workout_id)
     if workout is None:
         raise HTTPException(
@@ -50,16 +138,15 @@ async def get_workout(
             },
         )
 
-    return AppResponse(
-        data=WorkoutPublic.model_validate(workout),
-        status=status.HTTP_200_OK,
+    return await cache.respond(
+        AppResponse[WorkoutPublic](data=workout, status=status.HTTP_200_OK)
     )
 
 
-@router.post("/")
+@router.post("/", response_model=AppResponse)
 async def create_workout(
     session: SessionDep, user: CurrentUser, workout_data: WorkoutCreate
-) -> AppResponse:
+) -> AppJSONResponse:
     if workout_data.goal_id:
         goal = await goal_crud.get_goal_by_id(session, user, workout_data.goal_id)
         if goal is None:
@@ -70,10 +157,7 @@ async def create_workout(
                 },
             )
 
-        calories_burned = await workout_crud.get_workout_calories_burned_by_goal(
-            session, goal.id
-        )
-        if calories_burned >= goal.target_calories:
+        if goal.calories_progress >= goal.target_calories:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail={
@@ -85,19 +169,130 @@ async def create_workout(
 
     await workout_crud.create_workout(session, user, workout_data)
 
-    return AppResponse(
-        message="Created Successfully",
-        status=status.HTTP_201_CREATED,
+    return AppJSONResponse(
+        AppResponse(message="Created Successfully", status=status.HTTP_201_CREATED)
+    )
+
+
+@router.post(
+    "/bulk",
+    response_model=AppResponse[list[WorkoutBulkResult]],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {
+                    "schema": {
+                        "type": "array",
+                        "items": WorkoutCreate.model_json_schema(),
+                    }
+                }
+                for media_type in ("application/json", NDJSON_MEDIA_TYPE)
+            },
+        }
+    },
+)
+async def create_workouts_bulk(
+    session: SessionDep, user: CurrentUser, request: Request
+) -> AppJSONResponse:
+    """Create many workouts at once, from a JSON array or NDJSON.
+
+    Invalid items are reported back and skipped; the rest are created
+    together, checked against their goals as if posted one by one.
+    """
+    items = await read_json_items(request, settings.WORKOUT_BULK_MAX_ITEMS)
+
+    results: list[WorkoutBulkResult] = []
+    workouts: list[tuple[int, WorkoutCreate]] = []
+    for index, item in enumerate(items):
+        if isinstance(item, InvalidItem):
+            results.append(
+                WorkoutBulkResult(
+                    index=index,
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    errors=f"Invalid JSON: {item}",
+                )
+            )
+            continue
+
+        try:
+            workouts.append((index, WorkoutCreate.model_validate(item)))
+        except ValidationError as error:
+            results.append(
+                WorkoutBulkResult(
+                    index=index,
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    errors=error.errors(include_url=False, include_context=False),
+                )
+            )
+
+    goals = await goal_crud.get_goals_by_ids(
+        session, user, {workout.goal_id for _, workout in workouts if workout.goal_id}
     )
+    calories_progress = {goal.id: goal.calories_progress for goal in goals.values()}
+
+    accepted: list[tuple[int, WorkoutCreate]] = []
+    for index, workout_data in workouts:
+        if workout_data.goal_id:
+            goal = goals.get(workout_data.goal_id)
+            if goal is None:
+                results.append(
+                    WorkoutBulkResult(
+                        index=index,
+                        status=status.HTTP_404_NOT_FOUND,
+                        errors="Goal not exist",
+                    )
+                )
+                continue
+
+            if calories_progress[goal.id] >= goal.target_calories:
+                results.append(
+                    WorkoutBulkResult(
+                        index=index,
+                        status=status.HTTP_409_CONFLICT,
+                        errors="Goal reached consider changing target.",
+                    )
+                )
+                continue
 
+            calories_progress[goal.id] += workout_data.calories_burned
+            workout_data.exercise = goal.target_exercise
 
-@router.patch("/{workout_id}")
+        accepted.append((index, workout_data))
+
+    workout_ids = await workout_crud.create_workouts(
+        session, user, [workout_data for _, workout_data in accepted]
+    )
+    results.extend(
+        WorkoutBulkResult(index=index, status=status.HTTP_201_CREATED, id=workout_id)
+        for (index, _), workout_id in zip(accepted, workout_ids)
+    )
+    results.sort(key=lambda result: result.index)
+
+    if len(accepted) == len(items):
+        return AppJSONResponse(
+            AppResponse(
+                data=results,
+                message="Created Successfully",
+                status=status.HTTP_201_CREATED,
+            )
+        )
+    return AppJSONResponse(
+        AppResponse(
+            data=results,
+            message="Some workouts were not created",
+            status=status.HTTP_207_MULTI_STATUS,
+        )
+    )
+
+
+@router.patch("/{workout_id}", response_model=AppResponse)
 async def update_workout(
     session: SessionDep,
     user: CurrentUser,
     workout_id: UUID4,
     workout_data: WorkoutUpdate,
-) -> AppResponse:
+) -> AppJSONResponse:
     workout = await workout_crud.get_workout(session, user, workout_id)
     if workout is None:
         raise HTTPException(
@@ -117,10 +312,7 @@ async def update_workout(
                 },
             )
 
-        calories_burned = await workout_crud.get_workout_calories_burned_by_goal(
-            session, goal.id
-        )
-        if calories_burned >= goal.target_calories:
+        if goal.calories_progress >= goal.target_calories:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail={
@@ -132,9 +324,8 @@ async def update_workout(
 
     await workout_crud.update_workout(session, workout, workout_data)
 
-    return AppResponse(
-        message="Updated Successfully",
-        status=status.HTTP_200_OK,
+    return AppJSONResponse(
+        AppResponse(message="Updated Successfully", status=status.HTTP_200_OK)
     )
 
 
@@ -1,13 +1,285 @@
-from typing import AsyncGenerator
+import logging
+import time
+from contextvars import ContextVar
+from functools import cache
+from typing import Any, AsyncGenerator
+from uuid import UUID
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import anyio
+from redis.exceptions import RedisError
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
 
 from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.utils.cache import TTLCache
+from app.utils.metrics import QUERY_SECONDS, Gauge, Values
+from app.utils.sql_profiler import current_profile
 
+logger = logging.getLogger(__name__)
+
+
+def set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    # WAL lets readers run alongside the single writer instead of blocking
+    # on it, and busy_timeout makes writers wait for the lock, not fail
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+
+# a one item list counting the statements of the request being served
+request_queries: ContextVar[list[int] | None] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def start_query_timer(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+    queries = request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+
+
+def stop_query_timer(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+    operation = statement.split(None, 1)[0].upper() if statement.strip() else ""
+    QUERY_SECONDS.observe(elapsed, operation=operation)
+
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+
+
+def drop_query_timer(context: Any) -> None:
+    # a failed statement never reaches after_cursor_execute
+    if context.connection is not None:
+        started = context.connection.info.get("query_started_at")
+        if started:
+            started.pop()
+
+
+def create_engine(url: str) -> AsyncEngine:
+    if make_url(url).get_backend_name() == "sqlite":
+        engine = create_async_engine(url)
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+    else:
+        engine = create_async_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+
+    event.listen(engine.sync_engine, "before_cursor_execute", start_query_timer)
+    event.listen(engine.sync_engine, "after_cursor_execute", stop_query_timer)
+    event.listen(engine.sync_engine, "handle_error", drop_query_timer)
+    return engine
+
+
+class ReplicaRouter:
+    """Round-robin over the replica engines that passed their last health check.
+
+    The API checks the replicas every `interval` seconds in the background
+    (see `keep_checked`), so requests never wait on a check. Elsewhere, e.g.
+    in Celery tasks, the first use after `interval` elapses checks them.
+    """
+
+    def __init__(self, engines: list[AsyncEngine], interval: float) -> None:
+        self.engines = engines
+        self.interval = interval
+        self._healthy: list[AsyncEngine] = []
+        self._checked_at = float("-inf")
+        self._next = 0
+        self._in_background = False
+
+    async def _is_healthy(self, engine: AsyncEngine) -> bool:
+        try:
+            with anyio.fail_after(settings.REPLICA_HEALTH_CHECK_TIMEOUT):
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+        except Exception:
+            logger.warning("Replica %r is unhealthy", engine.url, exc_info=True)
+            return False
+        return True
+
+    async def check(self) -> None:
+        # set first, so requests arriving meanwhile don't start their own check
+        self._checked_at = time.monotonic()
+        healthy: set[AsyncEngine] = set()
+
+        async def probe(engine: AsyncEngine) -> None:
+            if await self._is_healthy(engine):
+                healthy.add(engine)
+
+        # at most one REPLICA_HEALTH_CHECK_TIMEOUT, however many replicas are down
+        async with anyio.create_task_group() as tg:
+            for engine in self.engines:
+                tg.start_soon(probe, engine)
+        self._healthy = [engine for engine in self.engines if engine in healthy]
+
+    async def keep_checked(self) -> None:
+        """Check the replicas every `interval` seconds, until cancelled."""
+        self._in_background = True
+        try:
+            while True:
+                await self.check()
+                await anyio.sleep(self.interval)
+        finally:
+            self._in_background = False
+
+    async def get_engine(self) -> AsyncEngine | None:
+        if (
+            not self._in_background
+            and time.monotonic() - self._checked_at >= self.interval
+        ):
+            await self.check()
+        if not self._healthy:
+            return None
+
+        self._next = (self._next + 1) % len(self._healthy)
+        return self._healthy[self._next - 1]
+
+
+class PrimarySession(Session):
+    pass
+
+
+# users whose writes a replica may not have caught up with yet
+recent_writers: TTLCache[UUID, bool] = TTLCache(
+    10_000, settings.READ_YOUR_WRITES_WINDOW
+)
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def remember_writer(session: Session) -> None:
+    # set by get_current_user for the request's session
+    user_id = session.info.get("user_id")
+    if user_id is not None:
+        recent_writers.set(user_id, True)
+        session.info["wrote"] = True
+
+
+async def has_recent_write(user_id: UUID) -> bool:
+    if recent_writers.get(user_id):
+        return True
+
+    # the write may have been served by another worker
+    try:
+        return bool(await get_async_redis().exists(f"wrote:{user_id}"))
+    except RedisError:
+        logger.warning("Read-your-writes marker unavailable", exc_info=True)
+        return True
+
+
+async def share_recent_write(user_id: UUID) -> None:
+    try:
+        await get_async_redis().set(
+            f"wrote:{user_id}", 1, px=int(settings.READ_YOUR_WRITES_WINDOW * 1000)
+        )
+    except RedisError:
+        logger.warning("Read-your-writes marker unavailable", exc_info=True)
+
+
+@cache
+def get_engine() -> AsyncEngine:
+    """The primary engine, created on first use rather than on import."""
+    return create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+
+
+@cache
+def get_replicas() -> ReplicaRouter | None:
+    if not settings.DATABASE_REPLICA_URLS:
+        return None
+    return ReplicaRouter(
+        [create_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+        settings.REPLICA_HEALTH_CHECK_INTERVAL,
+    )
+
+
+async def dispose_engines() -> None:
+    """Close every pooled connection, e.g. on shutdown."""
+    await get_engine().dispose()
+    replicas = get_replicas()
+    if replicas is not None:
+        for engine in replicas.engines:
+            await engine.dispose()
+
+
+# bound to an engine for each session, see aget_db and aget_read_db
+async_session = async_sessionmaker(
+    expire_on_commit=False, sync_session_class=PrimarySession
+)
+read_session = async_sessionmaker(expire_on_commit=False)
+
+
+def pool_connections() -> Values:
+    engines = {"primary": get_engine()}
+    replicas = get_replicas()
+    if replicas is not None:
+        for index, engine in enumerate(replicas.engines):
+            engines[f"replica{index}"] = engine
+
+    values: Values = {}
+    for name, engine in engines.items():
+        pool = engine.sync_engine.pool
+        if isinstance(pool, QueuePool):
+            values[(name, "size")] = pool.size()
+            values[(name, "checked_out")] = pool.checkedout()
+            values[(name, "overflow")] = max(pool.overflow(), 0)
+    return values
+
+
+Gauge(
+    "db_pool_connections",
+    "Connections in each engine's pool, by state.",
+    ["engine", "state"],
+    pool_connections,
+)
 
-async_engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
-async_session = async_sessionmaker(async_engine, expire_on_commit=False)
 
 async def aget_db() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session() as session:
+    async with async_session(bind=get_engine()) as session:
+        yield session
+
+        if get_replicas() is not None and session.info.get("wrote"):
+            await share_recent_write(session.info["user_id"])
+
+
+async def aget_read_db(
+    user_id: UUID | None = None, primary: AsyncSession | None = None
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only work, on a healthy replica when there is one.
+
+    Falls back to the primary when no replica is up, and for a user who
+    wrote within READ_YOUR_WRITES_WINDOW, so they always see their writes.
+    The fallback reuses `primary`, a session the caller already holds,
+    rather than checking out a second connection.
+    """
+    engine = None
+    replicas = get_replicas()
+    if replicas is not None and not (user_id and await has_recent_write(user_id)):
+        engine = await replicas.get_engine()
+
+    if engine is None:
+        if primary is not None:
+            yield primary
+            return
+        async for session in aget_db():
+            yield session
+        return
+
+    async with read_session(bind=engine) as session:
         yield session
@@ -0,0 +1,33 @@
+from functools import cache
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+from app.core.config import settings
+
+
+@cache
+def get_redis() -> Redis:
+    return Redis.from_url(
+        str(settings.REDIS_URI),
+        decode_responses=True,
+        socket_connect_timeout=settings.REDIS_TIMEOUT,
+        socket_timeout=settings.REDIS_TIMEOUT,
+    )
+
+
+@cache
+def get_async_redis() -> AsyncRedis:
+    return AsyncRedis.from_url(
+        str(settings.REDIS_URI),
+        decode_responses=True,
+        socket_connect_timeout=settings.REDIS_TIMEOUT,
+        socket_timeout=settings.REDIS_TIMEOUT,
+    )
+
+
+async def close_async_redis() -> None:
+    """Close the async client's connections, if it was ever created."""
+    if get_async_redis.cache_info().currsize:
+        await get_async_redis().aclose()
+        get_async_redis.cache_clear()
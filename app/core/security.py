@@ -1,6 +1,8 @@
 from datetime import timedelta
-from typing import Annotated, Any
+from typing import Annotated, Any, Callable, TypeVar
 
+import anyio
+import anyio.to_thread
 import bcrypt
 import jwt
 from fastapi import Form, status
@@ -11,10 +13,13 @@ from pydantic import ValidationError
 
 from app.core.config import settings
 from app.utils import date_tz
+from app.utils.metrics import PASSWORD_HASH_REJECTED, PASSWORD_HASH_SECONDS
 
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
 
 class PublicOAuth2PasswordBearer(OAuth2PasswordBearer):
     pass
@@ -31,18 +36,60 @@ class PublicOAuth2PasswordRequestForm:
         self.password = password
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+_hash_limiter: anyio.CapacityLimiter | None = None
+
+
+async def run_password_hasher(func: Callable[..., T], *args: Any) -> T:
+    """Run a bcrypt call in a worker thread, off the event loop.
+
+    At most PASSWORD_HASH_WORKERS calls run at once. Once
+    PASSWORD_HASH_MAX_QUEUE more are waiting, further calls are refused with
+    a 503 rather than queued behind them.
+    """
+    global _hash_limiter
+    if _hash_limiter is None:
+        _hash_limiter = anyio.CapacityLimiter(settings.PASSWORD_HASH_WORKERS)
+
+    if _hash_limiter.statistics().tasks_waiting >= settings.PASSWORD_HASH_MAX_QUEUE:
+        PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    def timed() -> T:
+        with PASSWORD_HASH_SECONDS.time(operation=func.__name__.lstrip("_")):
+            return func(*args)
+
+    return await anyio.to_thread.run_sync(timed, limiter=_hash_limiter)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
     encoded_plain_password = plain_password.encode()
     encoded_hashed_password = hashed_password.encode()
     return bcrypt.checkpw(encoded_plain_password, encoded_hashed_password)
 
 
-def get_password_hash(password: str) -> str:
+def _get_password_hash(password: str) -> str:
     encoded_password = password.encode()
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     return bcrypt.hashpw(encoded_password, salt).decode()
 
 
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_hasher(_verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash(password: str) -> str:
+    return await run_password_hasher(_get_password_hash, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like $2b$<rounds>$<salt and hash>
+    return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+
+
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     if expires_delta is not None:
         expires_at = date_tz.now() + expires_delta
@@ -1,13 +1,18 @@
+from typing import Any, Collection, Mapping, Sequence
 from uuid import UUID
 
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from sqlalchemy.sql import func, select
+from sqlalchemy.sql import bindparam, func, select, update
 
+from app.crud import workout_rollups as rollup_crud
+from app.crud.pagination import Page, paginate
 from app.models.goals import Goal
 from app.models.users import User
 from app.models.workouts import Workout
 from app.schemas.goals import GoalCreate, GoalUpdate
+from app.utils.response_cache import bump_all_versions, bump_version
 
 
 async def get_all_goals(session: AsyncSession) -> list[Goal]:
@@ -21,26 +26,15 @@ async def get_all_goals(session: AsyncSession) -> list[Goal]:
 
 
 async def get_all_paginated_goals(
-    session: AsyncSession, user: User, page: int, limit: int
-) -> list[Goal]:
-    page_limit = limit * page
-    offset = (page - 1) * limit
-    query = (
-        select(Goal)
-        .where(Goal.user == user, Goal.is_deleted == False)
-        .offset(offset)
-        .limit(page_limit)
-    )
-    db_objs = await session.scalars(query)
-    return list(db_objs.all())
-
-
-async def total_goals(session: AsyncSession, user: User) -> int:
-    query = select(func.count(Goal.id)).where(
-        Goal.user == user, Goal.is_deleted == False
-    )
-    db_obj = await session.scalar(query)
-    return db_obj or 0
+    session: AsyncSession,
+    user: User,
+    page: int,
+    limit: int,
+    cursor: str | None = None,
+    include_total: bool = True,
+) -> Page[Goal]:
+    query = select(Goal).where(Goal.user == user, Goal.is_deleted == False)
+    return await paginate(session, query, Goal, page, limit, cursor, include_total)
 
 
 async def get_goal_by_id(
@@ -54,6 +48,16 @@ async def get_goal_by_id(
     return goal
 
 
+async def get_goals_by_ids(
+    session: AsyncSession, user: User, goal_ids: Collection[UUID]
+) -> dict[UUID, Goal]:
+    query = select(Goal).where(
+        Goal.id.in_(goal_ids), Goal.user == user, Goal.is_deleted == False
+    )
+    goals = await session.scalars(query)
+    return {goal.id: goal for goal in goals}
+
+
 async def create_goal(
     session: AsyncSession, user: User, workout_data: GoalCreate
 ) -> Goal:
@@ -67,6 +71,7 @@ async def create_goal(
 
     session.add(goal)
     await session.commit()
+    await bump_version(goal.user_id)
     await session.refresh(goal)
     return goal
 
@@ -82,26 +87,151 @@ async def update_goal(session: AsyncSession, goal: Goal, goal_data: GoalUpdate)
 
     session.add(goal)
     await session.commit()
+    await bump_version(goal.user_id)
     await session.refresh(goal)
     return goal
 
 
 async def delete_goal(session: AsyncSession, goal: Goal) -> None:
+    # the goal's workouts disappear with it, so they leave the stats too
+    workouts = await session.execute(
+        select(
+            Workout.user_id,
+            Workout.created_at,
+            Workout.exercise,
+            Workout.calories_burned,
+            Workout.duration,
+        ).where(Workout.goal_id == goal.id, Workout.is_deleted == False)
+    )
+    deltas: rollup_crud.RollupDeltas = {}
+    for workout in workouts:
+        rollup_crud.add_rollup_delta(
+            deltas,
+            workout.user_id,
+            workout.created_at,
+            workout.exercise,
+            -workout.calories_burned,
+            -workout.duration,
+            -1,
+        )
+    await rollup_crud.apply_rollup_deltas(session, deltas)
+
     goal.is_deleted = True
     session.add(goal)
     await session.commit()
+    await bump_version(goal.user_id)
+
+
+async def get_achieved_goals_batch(
+    session: AsyncSession,
+    after_user_id: UUID | None,
+    limit: int,
+    before_user_id: UUID | None = None,
+) -> Sequence[Row[Any]]:
+    """Achieved but unnotified goals of the next `limit` active users.
+
+    Users are walked in id order after `after_user_id` (and, for a shard,
+    before `before_user_id`), so every goal of a user lands in the same
+    batch. Rows carry the user's email for mailing.
+    """
+    achieved = (
+        Goal.is_notified == False,
+        Goal.is_deleted == False,
+        Goal.calories_progress >= Goal.target_calories,
+        User.is_active == True,
+        User.is_deleted == False,
+    )
+    users = (
+        select(Goal.user_id)
+        .join(User, Goal.user_id == User.id)
+        .where(*achieved)
+        .distinct()
+        .order_by(Goal.user_id)
+        .limit(limit)
+    )
+    if after_user_id is not None:
+        users = users.where(Goal.user_id > after_user_id)
+    if before_user_id is not None:
+        users = users.where(Goal.user_id < before_user_id)
+
+    query = (
+        select(
+            Goal.id,
+            Goal.user_id,
+            User.email,
+            Goal.target_exercise,
+            Goal.target_calories,
+        )
+        .join(User, Goal.user_id == User.id)
+        .where(*achieved, Goal.user_id.in_(users))
+        .order_by(Goal.user_id, Goal.id)
+    )
+
+    goals = await session.execute(query)
+    return goals.all()
+
+
+async def mark_goals_notified(session: AsyncSession, goal_ids: list[UUID]) -> None:
+    query = update(Goal).where(Goal.id.in_(goal_ids)).values(is_notified=True)
+    await session.execute(query, execution_options={"synchronize_session": False})
+    await session.commit()
 
 
-async def get_achieved_goals(session: AsyncSession, user: User) -> list[Goal]:
+async def add_goal_progress(
+    session: AsyncSession, goal_id: UUID, calories_burned: float, duration: int
+) -> None:
+    """Shift a goal's progress counters within the caller's transaction."""
     query = (
-        select(Goal)
-        .join(Workout, Workout.goal_id == Goal.id)
-        .where(
-            Goal.is_notified == False, Goal.is_deleted == False, Goal.user_id == user.id
+        update(Goal)
+        .where(Goal.id == goal_id)
+        .values(
+            calories_progress=Goal.calories_progress + calories_burned,
+            duration_progress=Goal.duration_progress + duration,
         )
-        .group_by(Goal.id, Goal.target_calories)
-        .having(Goal.target_calories <= func.sum(Workout.calories_burned))
     )
+    await session.execute(query)
 
-    goals = await session.scalars(query)
-    return list(goals.all())
+
+async def add_goals_progress(
+    session: AsyncSession, progress: Mapping[UUID, tuple[float, int]]
+) -> None:
+    """`add_goal_progress` for many goals at once, in a single executemany."""
+    if not progress:
+        return
+
+    query = (
+        update(Goal)
+        .where(Goal.id == bindparam("goal_id"))
+        .values(
+            calories_progress=Goal.calories_progress + bindparam("calories_burned"),
+            duration_progress=Goal.duration_progress + bindparam("duration"),
+        )
+    )
+    connection = await session.connection()
+    await connection.execute(
+        query,
+        [
+            {"goal_id": goal_id, "calories_burned": calories, "duration": duration}
+            for goal_id, (calories, duration) in progress.items()
+        ],
+    )
+
+
+async def recompute_goal_progress(session: AsyncSession) -> None:
+    """Rebuild every goal's progress counters from its workouts."""
+    workouts = select(Workout).where(
+        Workout.goal_id == Goal.id, Workout.is_deleted == False
+    )
+    calories_burned = workouts.with_only_columns(
+        func.coalesce(func.sum(Workout.calories_burned), 0)
+    ).scalar_subquery()
+    duration = workouts.with_only_columns(
+        func.coalesce(func.sum(Workout.duration), 0)
+    ).scalar_subquery()
+
+    query = update(Goal).values(
+        calories_progress=calories_burned, duration_progress=duration
+    )
+    await session.execute(query, execution_options={"synchronize_session": False})
+    await session.commit()
+    await bump_all_versions()
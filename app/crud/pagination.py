@@ -0,0 +1,93 @@
+from typing import Generic, NamedTuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select, func, select, tuple_
+
+from app.models.base import Base
+from app.utils.cursor import decode_cursor, encode_cursor
+
+T = TypeVar("T", bound=Base)
+
+
+class Page(NamedTuple, Generic[T]):
+    items: list[T]
+    total: int | None = None
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+def count_query(query: Select) -> Select[tuple[int]]:
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+async def paginate(
+    session: AsyncSession,
+    query: Select[tuple[T]],
+    model: type[T],
+    page: int,
+    limit: int,
+    cursor: str | None = None,
+    include_total: bool = True,
+) -> Page[T]:
+    """Newest-first pagination on the composite (created_at, id) key.
+
+    Without a cursor the page is fetched by OFFSET, otherwise the query seeks
+    past the cursor position so deep pages cost the same as the first one.
+    Both modes hand back cursors so clients can switch to seeking at any time.
+
+    The total is selected alongside the page in the same statement. It is
+    counted over the unseeked filters, so it stays the same on every page.
+    """
+    key = tuple_(model.created_at, model.id)
+    newest_first = (model.created_at.desc(), model.id.desc())
+    direction = "next"
+    filtered = query
+
+    if include_total:
+        total_column = count_query(filtered).scalar_subquery().label("total")
+        query = query.add_columns(total_column)
+
+    if cursor:
+        position = decode_cursor(cursor)
+        direction = position.direction
+        if direction == "next":
+            query = query.where(key < tuple_(position.created_at, position.id))
+            query = query.order_by(*newest_first)
+        else:
+            query = query.where(key > tuple_(position.created_at, position.id))
+            query = query.order_by(model.created_at.asc(), model.id.asc())
+    else:
+        query = query.order_by(*newest_first).offset((page - 1) * limit)
+
+    # one extra row tells whether another page exists without counting
+    result = await session.execute(query.limit(limit + 1))
+    rows = list(result.all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if direction == "prev":
+        rows.reverse()
+
+    items = [row[0] for row in rows]
+    total = None
+    if include_total:
+        if rows:
+            total = rows[0].total
+        elif cursor or page > 1:
+            # past the last row nothing carries the total, count it directly
+            total = await session.scalar(count_query(filtered)) or 0
+        else:
+            total = 0
+
+    if not items:
+        return Page(items=items, total=total)
+
+    first, last = items[0], items[-1]
+    has_next = has_more if direction == "next" else True
+    has_prev = has_more if direction == "prev" else bool(cursor) or page > 1
+
+    next_cursor = encode_cursor(last.created_at, last.id, "next") if has_next else None
+    prev_cursor = encode_cursor(first.created_at, first.id, "prev") if has_prev else None
+    return Page(
+        items=items, total=total, next_cursor=next_cursor, prev_cursor=prev_cursor
+    )
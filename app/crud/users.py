@@ -1,10 +1,37 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Sequence
 from uuid import UUID
+from pydantic_core import to_json
+from redis.exceptions import RedisError
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import make_transient_to_detached
 from sqlalchemy.sql import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.core.security import (
+    get_password_hash,
+    password_needs_rehash,
+    verify_password,
+)
 from app.models.users import User
 from app.schemas.users import UserCreate, UserUpdate
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# authenticated users by email, as plain column values
+user_cache: TTLCache[str, dict[str, Any]] = TTLCache(
+    settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL
+)
+
+# the password hash is never cached
+CACHED_COLUMNS = [
+    column for column in User.__table__.columns if column.key != "password"
+]
 
 
 async def authenticate(session: AsyncSession, email: str, password: str) -> User | None:
@@ -12,9 +39,15 @@ async def authenticate(session: AsyncSession, email: str, password: str) -> User
     if not db_user:
         return None
 
-    if not verify_password(password, db_user.password):
+    if not await verify_password(password, db_user.password):
         return None
 
+    if password_needs_rehash(db_user.password):
+        # BCRYPT_ROUNDS changed since this hash was made
+        db_user.password = await get_password_hash(password)
+        session.add(db_user)
+        await session.commit()
+
     return db_user
 
 
@@ -24,12 +57,98 @@ async def get_all_user(session: AsyncSession) -> list[User]:
     return list(users.all())
 
 
+async def get_active_users_batch(
+    session: AsyncSession,
+    after_user_id: UUID | None,
+    limit: int,
+    before_user_id: UUID | None = None,
+) -> Sequence[Row[Any]]:
+    query = (
+        select(User.id, User.email)
+        .where(User.is_deleted == False, User.is_active == True)
+        .order_by(User.id)
+        .limit(limit)
+    )
+    if after_user_id is not None:
+        query = query.where(User.id > after_user_id)
+    if before_user_id is not None:
+        query = query.where(User.id < before_user_id)
+
+    users = await session.execute(query)
+    return users.all()
+
+
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
     query = select(User).where(User.email == email)
     db_obj = await session.scalar(query)
     return db_obj
 
 
+async def _get_shared_cached_user(email: str) -> dict[str, Any] | None:
+    try:
+        cached = await get_async_redis().get(f"user:{email}")
+    except RedisError:
+        logger.warning("User cache unavailable", exc_info=True)
+        return None
+    if cached is None:
+        return None
+
+    data = json.loads(cached)
+    for column in CACHED_COLUMNS:
+        if column.type.python_type is UUID:
+            data[column.key] = UUID(data[column.key])
+        elif column.type.python_type is datetime:
+            data[column.key] = datetime.fromisoformat(data[column.key])
+    return data
+
+
+async def _set_shared_cached_user(email: str, data: dict[str, Any]) -> None:
+    try:
+        await get_async_redis().set(
+            f"user:{email}", to_json(data), ex=settings.USER_CACHE_TTL
+        )
+    except RedisError:
+        logger.warning("User cache unavailable", exc_info=True)
+
+
+async def get_cached_user_by_email(session: AsyncSession, email: str) -> User | None:
+    """`get_user_by_email` served from the user cache when possible.
+
+    A cached user is attached to `session` without a query, so it works in
+    relationships and comparisons like a loaded one, except that its
+    password is not loaded.
+    """
+    data = user_cache.get(email)
+    if data is None and settings.USER_CACHE_REDIS:
+        data = await _get_shared_cached_user(email)
+        if data is not None:
+            user_cache.set(email, data)
+
+    if data is None:
+        db_user = await get_user_by_email(session, email)
+        if db_user is not None:
+            data = {
+                column.key: getattr(db_user, column.key) for column in CACHED_COLUMNS
+            }
+            user_cache.set(email, data)
+            if settings.USER_CACHE_REDIS:
+                await _set_shared_cached_user(email, data)
+        return db_user
+
+    user = User(**data)
+    make_transient_to_detached(user)
+    return await session.merge(user, load=False)
+
+
+async def invalidate_cached_user(email: str) -> None:
+    user_cache.delete(email)
+    if settings.USER_CACHE_REDIS:
+        try:
+            await get_async_redis().delete(f"user:{email}")
+        except RedisError:
+            logger.warning("User cache unavailable", exc_info=True)
+
+
 async def create_user(
     session: AsyncSession, user_create: UserCreate, is_staff=False
 ) -> User:
@@ -37,7 +156,7 @@ async def create_user(
         first_name=user_create.first_name,
         last_name=user_create.last_name,
         email=user_create.email,
-        password=get_password_hash(user_create.password),
+        password=await get_password_hash(user_create.password),
     )
     if is_staff:
         db_obj.is_staff = is_staff
@@ -58,10 +177,26 @@ async def update_user(
 
     session.add(db_user)
     await session.commit()
+    await invalidate_cached_user(db_user.email)
     await session.refresh(db_user)
     return db_user
 
 
+async def deactivate_user(session: AsyncSession, db_user: User) -> User:
+    db_user.is_active = False
+    session.add(db_user)
+    await session.commit()
+    await invalidate_cached_user(db_user.email)
+    return db_user
+
+
+async def delete_user(session: AsyncSession, db_user: User) -> None:
+    db_user.is_deleted = True
+    session.add(db_user)
+    await session.commit()
+    await invalidate_cached_user(db_user.email)
+
+
 async def get_user(session: AsyncSession, user_id: UUID) -> User | None:
     db_users = await session.scalar(select(User).where(User.id == user_id))
     return db_users
@@ -0,0 +1,176 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Literal
+from uuid import UUID
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import delete, func, insert, or_, select, type_coerce
+from sqlalchemy.types import Date
+
+from app.models.goals import Goal
+from app.models.users import User
+from app.models.workout_rollups import WorkoutDailyRollup
+from app.models.workouts import Workout
+from app.utils import date_tz
+
+# (user_id, day, exercise) -> (calories_burned, duration, workouts)
+RollupDeltas = dict[tuple[UUID, date, str], tuple[float, int, int]]
+
+Period = Literal["day", "week", "month"]
+
+
+def add_rollup_delta(
+    deltas: RollupDeltas,
+    user_id: UUID,
+    created_at: datetime,
+    exercise: str,
+    calories_burned: float,
+    duration: int,
+    workouts: int,
+) -> None:
+    key = (user_id, created_at.date(), exercise)
+    calories, minutes, count = deltas.get(key, (0, 0, 0))
+    deltas[key] = (calories + calories_burned, minutes + duration, count + workouts)
+
+
+async def apply_rollup_deltas(session: AsyncSession, deltas: RollupDeltas) -> None:
+    """Upsert daily rollups within the caller's transaction."""
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+    query = dialect.insert(WorkoutDailyRollup)
+    query = query.on_conflict_do_update(
+        index_elements=["user_id", "day", "exercise"],
+        set_={
+            "calories_burned": WorkoutDailyRollup.calories_burned
+            + query.excluded.calories_burned,
+            "duration": WorkoutDailyRollup.duration + query.excluded.duration,
+            "workouts": WorkoutDailyRollup.workouts + query.excluded.workouts,
+            "updated_at": date_tz.now(),
+        },
+    )
+    await session.execute(
+        query,
+        [
+            {
+                "user_id": user_id,
+                "day": day,
+                "exercise": exercise,
+                "calories_burned": calories_burned,
+                "duration": duration,
+                "workouts": workouts,
+            }
+            for (user_id, day, exercise), (
+                calories_burned,
+                duration,
+                workouts,
+            ) in deltas.items()
+        ],
+    )
+
+
+def period_start(day: date, period: Period) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    elif period == "month":
+        return day.replace(day=1)
+    return day
+
+
+async def get_workout_stats(
+    session: AsyncSession,
+    user: User,
+    period: Period = "day",
+    exercise: str = "",
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[dict[str, Any]]:
+    """Calories, duration and workout count per period and exercise.
+
+    Reads only the daily rollups; weeks (starting Monday) and months are
+    summed up from their days.
+    """
+    query = (
+        select(
+            WorkoutDailyRollup.day,
+            WorkoutDailyRollup.exercise,
+            WorkoutDailyRollup.calories_burned,
+            WorkoutDailyRollup.duration,
+            WorkoutDailyRollup.workouts,
+        )
+        .where(WorkoutDailyRollup.user_id == user.id, WorkoutDailyRollup.workouts > 0)
+        .order_by(WorkoutDailyRollup.day, WorkoutDailyRollup.exercise)
+    )
+    if exercise:
+        query = query.where(WorkoutDailyRollup.exercise == exercise)
+    if start_date is not None:
+        query = query.where(WorkoutDailyRollup.day >= start_date)
+    if end_date is not None:
+        query = query.where(WorkoutDailyRollup.day < end_date)
+
+    stats: dict[tuple[date, str], dict[str, Any]] = {}
+    rollups = await session.execute(query)
+    for rollup in rollups:
+        key = (period_start(rollup.day, period), rollup.exercise)
+        if key not in stats:
+            stats[key] = {
+                "period_start": key[0],
+                "exercise": rollup.exercise,
+                "calories_burned": 0,
+                "duration": 0,
+                "workouts": 0,
+            }
+        stats[key]["calories_burned"] += rollup.calories_burned
+        stats[key]["duration"] += rollup.duration
+        stats[key]["workouts"] += rollup.workouts
+
+    return list(stats.values())
+
+
+async def rebuild_workout_rollups(session: AsyncSession, batch_size: int = 1000) -> int:
+    """Recompute every daily rollup from the workouts, returning the count.
+
+    Workouts of deleted goals are left out, as `delete_goal` subtracts them.
+    """
+    workout_day = type_coerce(func.date(Workout.created_at), Date).label("day")
+    query = (
+        select(
+            Workout.user_id,
+            workout_day,
+            Workout.exercise,
+            func.sum(Workout.calories_burned),
+            func.sum(Workout.duration),
+            func.count(),
+        )
+        .outerjoin(Goal, Workout.goal_id == Goal.id)
+        .where(
+            Workout.is_deleted == False,
+            or_(Workout.goal_id == None, Goal.is_deleted == False),
+        )
+        .group_by(Workout.user_id, workout_day, Workout.exercise)
+    )
+
+    await session.execute(delete(WorkoutDailyRollup))
+    rollups = await session.stream(query)
+    count = 0
+    async for batch in rollups.partitions(batch_size):
+        await session.execute(
+            insert(WorkoutDailyRollup),
+            [
+                {
+                    "user_id": user_id,
+                    "day": day,
+                    "exercise": exercise,
+                    "calories_burned": calories_burned,
+                    "duration": duration,
+                    "workouts": workouts,
+                }
+                for user_id, day, exercise, calories_burned, duration, workouts in batch
+            ],
+        )
+        count += len(batch)
+
+    await session.commit()
+    return count
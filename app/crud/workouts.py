@@ -1,21 +1,59 @@
-from datetime import datetime
-from uuid import UUID
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Sequence
+from uuid import UUID, uuid4
 
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from sqlalchemy.sql import func, select
+from sqlalchemy.sql import insert, select
 
+from app.crud import goals as goal_crud
+from app.crud import workout_rollups as rollup_crud
+from app.crud.pagination import Page, paginate
 from app.models.goals import Goal
 from app.models.users import User
 from app.models.workouts import Workout
 from app.schemas.workouts import WorkoutCreate, WorkoutUpdate
+from app.utils import date_tz
+from app.utils.response_cache import bump_version
+
+
+def timestamp_param(session: AsyncSession, value: datetime) -> datetime:
+    """A UTC datetime as it has to be bound to compare with a timestamp column.
+
+    SQLite keeps timestamps as naive UTC text and compares them as strings,
+    so the offset is dropped. PostgreSQL compares timestamptz instants and
+    asyncpg reads a naive value as the server's local time, so it is kept.
+    """
+    if session.bind.dialect.name == "sqlite" and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def add_workout_to_rollups(
+    deltas: rollup_crud.RollupDeltas, workout: Workout, sign: int
+) -> None:
+    rollup_crud.add_rollup_delta(
+        deltas,
+        workout.user_id,
+        workout.created_at,
+        workout.exercise,
+        sign * workout.calories_burned,
+        sign * workout.duration,
+        sign,
+    )
 
 
 async def get_all_workouts(
-    session: AsyncSession, user: User, page: int, limit: int, exercise: str
-) -> list[Workout]:
-    page_limit = limit * page
-    offset = (page - 1) * limit
+    session: AsyncSession,
+    user: User,
+    page: int,
+    limit: int,
+    exercise: str,
+    cursor: str | None = None,
+    include_total: bool = True,
+) -> Page[Workout]:
     query = (
         select(Workout)
         .options(selectinload(Workout.goal))
@@ -28,21 +66,7 @@ async def get_all_workouts(
     if exercise:
         query = query.where(Workout.exercise == exercise)
 
-    query = query.offset(offset).limit(page_limit)
-
-    db_objs = await session.scalars(query)
-    return list(db_objs.all())
-
-
-async def total_workouts(session: AsyncSession, user: User) -> int:
-    stmt = (
-        select(func.count(Workout.id))
-        .join(Goal, Workout.goal_id == Goal.id)
-        .where(
-            Workout.user == user, Workout.is_deleted == False, Goal.is_deleted == False
-        )
-    )
-    return await session.scalar(stmt) or 0
+    return await paginate(session, query, Workout, page, limit, cursor, include_total)
 
 
 async def get_workout(
@@ -76,21 +100,111 @@ async def create_workout(
     )
 
     session.add(workout)
+    if workout.goal_id:
+        await goal_crud.add_goal_progress(
+            session, workout.goal_id, workout.calories_burned, workout.duration
+        )
+
+    await session.flush()
+    deltas: rollup_crud.RollupDeltas = {}
+    add_workout_to_rollups(deltas, workout, 1)
+    await rollup_crud.apply_rollup_deltas(session, deltas)
+
     await session.commit()
+    await bump_version(workout.user_id)
     await session.refresh(workout)
     return workout
 
 
+async def create_workouts(
+    session: AsyncSession, user: User, workouts_data: Sequence[WorkoutCreate]
+) -> list[UUID]:
+    """Insert many workouts in one executemany and one transaction.
+
+    Goals are not checked here; the caller resolves them beforehand.
+    """
+    now = date_tz.now()
+    workouts = [
+        {
+            "id": uuid4(),
+            "created_at": now,
+            "exercise": workout_data.exercise,
+            "duration": workout_data.duration,
+            "calories_burned": workout_data.calories_burned,
+            "user_id": user.id,
+            "goal_id": workout_data.goal_id,
+        }
+        for workout_data in workouts_data
+    ]
+    if not workouts:
+        return []
+
+    progress: defaultdict[UUID, tuple[float, int]] = defaultdict(lambda: (0, 0))
+    deltas: rollup_crud.RollupDeltas = {}
+    for workout in workouts:
+        rollup_crud.add_rollup_delta(
+            deltas,
+            user.id,
+            now,
+            workout["exercise"],
+            workout["calories_burned"],
+            workout["duration"],
+            1,
+        )
+        if workout["goal_id"]:
+            calories, duration = progress[workout["goal_id"]]
+            progress[workout["goal_id"]] = (
+                calories + workout["calories_burned"],
+                duration + workout["duration"],
+            )
+
+    await session.execute(insert(Workout), workouts)
+    await goal_crud.add_goals_progress(session, progress)
+    await rollup_crud.apply_rollup_deltas(session, deltas)
+    await session.commit()
+    await bump_version(user.id)
+    return [workout["id"] for workout in workouts]
+
+
 async def update_workout(
     session: AsyncSession, workout: Workout, workout_data: WorkoutUpdate
 ) -> Workout:
     workout_dump = workout_data.model_dump(exclude_unset=True)
+    previous = (
+        workout.goal_id,
+        workout.exercise,
+        workout.calories_burned,
+        workout.duration,
+    )
+    deltas: rollup_crud.RollupDeltas = {}
+    add_workout_to_rollups(deltas, workout, -1)
 
     for var, value in workout_dump.items():
         setattr(workout, var, value)
 
     session.add(workout)
+    current = (
+        workout.goal_id,
+        workout.exercise,
+        workout.calories_burned,
+        workout.duration,
+    )
+    if current != previous:
+        add_workout_to_rollups(deltas, workout, 1)
+        await rollup_crud.apply_rollup_deltas(session, deltas)
+
+        goal_id, _, calories_burned, duration = previous
+        if goal_id:
+            await goal_crud.add_goal_progress(
+                session, goal_id, -calories_burned, -duration
+            )
+        if workout.goal_id:
+            await goal_crud.add_goal_progress(
+                session, workout.goal_id, workout.calories_burned, workout.duration
+            )
+
     await session.commit()
+    await bump_version(workout.user_id)
     await session.refresh(workout)
     return workout
 
@@ -98,31 +212,85 @@ async def update_workout(
 async def delete_workout(session: AsyncSession, workout: Workout) -> None:
     workout.is_deleted = True
     session.add(workout)
+    if workout.goal_id:
+        await goal_crud.add_goal_progress(
+            session, workout.goal_id, -workout.calories_burned, -workout.duration
+        )
+
+    deltas: rollup_crud.RollupDeltas = {}
+    add_workout_to_rollups(deltas, workout, -1)
+    await rollup_crud.apply_rollup_deltas(session, deltas)
+
     await session.commit()
+    await bump_version(workout.user_id)
 
 
-async def weekly_fitness_trend(
-    session: AsyncSession, user: User, start_date: datetime, end_date: datetime
-) -> list[Workout]:
+async def stream_weekly_fitness_trend(
+    session: AsyncSession,
+    user_ids: list[UUID],
+    start_date: datetime,
+    end_date: datetime,
+) -> AsyncIterator[Row[Any]]:
+    """Stream report columns of a batch of users' workouts, grouped by user."""
     query = (
-        select(Workout)
+        select(
+            Workout.user_id,
+            Workout.created_at,
+            Workout.calories_burned,
+            Workout.duration,
+        )
         .join(Goal, Workout.goal_id == Goal.id)
         .where(
-            Workout.user == user,
+            Workout.user_id.in_(user_ids),
             Workout.is_deleted == False,
             Goal.is_deleted == False,
         )
-        .where(Workout.created_at >= start_date, Workout.created_at <= end_date)
+        .where(
+            Workout.created_at >= timestamp_param(session, start_date),
+            Workout.created_at <= timestamp_param(session, end_date),
+        )
+        .order_by(Workout.user_id, Workout.created_at)
     )
-    workouts = await session.scalars(query)
-    return list(workouts.all())
+    workouts = await session.stream(query)
+    async for workout in workouts:
+        yield workout
 
 
-async def get_workout_calories_burned_by_goal(
-    session: AsyncSession, goal_id: UUID
-) -> float:
-    query = select(func.sum(Workout.calories_burned)).where(
-        Workout.goal_id == goal_id, Workout.is_deleted == False
+EXPORT_COLUMNS = (
+    Workout.id,
+    Workout.created_at,
+    Workout.exercise,
+    Workout.duration,
+    Workout.calories_burned,
+    Workout.goal_id,
+)
+
+
+async def stream_workouts(
+    session: AsyncSession,
+    user: User,
+    exercise: str = "",
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+) -> AsyncIterator[Row[Any]]:
+    """Stream export columns of a user's workouts, oldest first."""
+    query = (
+        select(*EXPORT_COLUMNS)
+        .join(Goal, Workout.goal_id == Goal.id)
+        .where(
+            Workout.user_id == user.id,
+            Workout.is_deleted == False,
+            Goal.is_deleted == False,
+        )
+        .order_by(Workout.created_at, Workout.id)
     )
-    calories_burned = await session.scalar(query)
-    return calories_burned if calories_burned else 0
+    if exercise:
+        query = query.where(Workout.exercise == exercise)
+    if start_date is not None:
+        query = query.where(Workout.created_at >= timestamp_param(session, start_date))
+    if end_date is not None:
+        query = query.where(Workout.created_at < timestamp_param(session, end_date))
+
+    workouts = await session.stream(query, execution_options={"yield_per": 500})
+    async for workout in workouts:
+        yield workout
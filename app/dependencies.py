@@ -1,18 +1,19 @@
 import secrets
-from typing import Annotated
+from typing import Annotated, AsyncGenerator
 
-from fastapi import Depends, Security, status
+from fastapi import Depends, Request, Security, status
 from fastapi.exceptions import HTTPException
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import aget_db
+from app.core.database import aget_db, aget_read_db
 from app.core.security import (
     PublicOAuth2PasswordBearer,
     decode_jwt_token,
 )
 from app.models.users import User
+from app.utils.response_cache import ResponseCache
 import app.crud.users as user_crud
 
 
@@ -27,8 +28,8 @@ TokenDep = Annotated[str, Security(oauth2_scheme_public)]
 
 async def get_current_user(session: SessionDep, token: TokenDep) -> User:
     payload = decode_jwt_token(token)
-    user = await user_crud.get_user_by_email(session, payload["sub"])
-    if not user:
+    user = await user_crud.get_cached_user_by_email(session, payload["sub"])
+    if not user or user.is_deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
@@ -36,12 +37,31 @@ async def get_current_user(session: SessionDep, token: TokenDep) -> User:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
         )
+
+    session.info["user_id"] = user.id
     return user
 
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+async def get_read_session(
+    session: SessionDep, user: CurrentUser
+) -> AsyncGenerator[AsyncSession, None]:
+    async for read_session in aget_read_db(user.id, session):
+        yield read_session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+def get_response_cache(request: Request, user: CurrentUser) -> ResponseCache:
+    return ResponseCache(request, user.id)
+
+
+ResponseCacheDep = Annotated[ResponseCache, Depends(get_response_cache)]
+
+
 def get_current_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
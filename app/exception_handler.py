@@ -2,12 +2,13 @@ from typing import cast
 from fastapi import status
 from fastapi.exceptions import HTTPException, RequestValidationError
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+
+from app.utils.responses import AppJSONResponse
 
 
 def request_validation_exception_handler(
     request: Request, exception: Exception
-) -> JSONResponse:
+) -> AppJSONResponse:
     exception = cast(RequestValidationError, exception)
     for err in exception.errors():
         if err.get("ctx"):
@@ -20,16 +21,16 @@ def request_validation_exception_handler(
         "status": status.HTTP_422_UNPROCESSABLE_ENTITY,
         "success": False,
     }
-    return JSONResponse(detail, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    return AppJSONResponse(detail, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
 
-def http_exception_handler(request: Request, exception: Exception) -> JSONResponse:
+def http_exception_handler(request: Request, exception: Exception) -> AppJSONResponse:
     exception = cast(HTTPException, exception)
     detail = {
         "errors": exception.detail,
         "status": exception.status_code,
         "success": False,
     }
-    return JSONResponse(
+    return AppJSONResponse(
         detail, status_code=exception.status_code, headers=exception.headers
     )
@@ -1,14 +1,16 @@
+import atexit
+import logging
 import os
-from pydantic import BaseModel
+from logging.config import dictConfig
+from logging.handlers import QueueHandler
 
-from app.utils import date_tz
+from pydantic import BaseModel
 
 
 def get_log_file_name():
-    today = date_tz.now().strftime("%Y-%m-%d")
     log_folder = os.path.join(os.getcwd(), "logs")
     os.makedirs(log_folder, exist_ok=True)
-    return os.path.join(log_folder, f"{today}.log")
+    return os.path.join(log_folder, "app.log")
 
 
 class LogConfig(BaseModel):
@@ -38,12 +40,39 @@ class LogConfig(BaseModel):
             "class": "logging.StreamHandler",
             "stream": "ext://sys.stderr",
         },
+        # shared by every worker process, so rotation is left to logrotate;
+        # the file is reopened once it has been moved away
         "file": {
             "formatter": "standard",
-            "class": "logging.FileHandler",
-            "filename": get_log_file_name(),
+            "class": "logging.handlers.WatchedFileHandler",
+            "filename": os.path.join("logs", "app.log"),
+            "encoding": "utf-8",
+            "delay": True,
+        },
+        # requests only enqueue records; a listener thread writes the file
+        "queue": {
+            "class": "logging.handlers.QueueHandler",
+            "handlers": ["file"],
+            "respect_handler_level": True,
         },
     }
     loggers: dict = {
-        LOGGER_NAME: {"handlers": ["file"], "level": LOG_LEVEL},
+        LOGGER_NAME: {"handlers": ["queue"], "level": LOG_LEVEL},
     }
+
+
+def setup_logging() -> None:
+    """Apply `LogConfig` and start the thread that drains the log queue.
+
+    Called on startup rather than on import, and only configures once.
+    """
+    if logging.getHandlerByName("queue") is not None:
+        return
+
+    config = LogConfig().model_dump()
+    config["handlers"]["file"]["filename"] = get_log_file_name()
+    dictConfig(config)
+    handler = logging.getHandlerByName("queue")
+    if isinstance(handler, QueueHandler) and handler.listener is not None:
+        handler.listener.start()
+        atexit.register(handler.listener.stop)
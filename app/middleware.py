@@ -1,16 +1,120 @@
 import logging
-from logging.config import dictConfig
+import time
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.logging_config import LogConfig
+from app.core.config import settings
+from app.core.database import request_queries
+from app.utils.metrics import REQUEST_QUERIES, REQUEST_SECONDS
+from app.utils.sql_profiler import QueryProfile, current_profile
 
-dictConfig(LogConfig().model_dump())
 logger = logging.getLogger("app")
 
 
-class SimpleLoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        logger.debug(f"Request received: {request.method} {request.url}")
-        return await call_next(request)
+class SimpleLoggingMiddleware:
+    """Log the method, path, status and latency of every HTTP request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            logger.info(
+                "%s %s %d %.1fms",
+                scope["method"],
+                scope["path"],
+                status_code,
+                (time.perf_counter() - start) * 1000,
+            )
+
+
+class MetricsMiddleware:
+    """Time every HTTP request and count its SQL statements, per route id."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        queries = [0]
+        token = request_queries.set(queries)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_queries.reset(token)
+            # set on the scope by the router once a route matched
+            route = getattr(scope.get("route"), "unique_id", "unmatched")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                route=route,
+                method=scope["method"],
+                status=status_code,
+            )
+            REQUEST_QUERIES.observe(queries[0], route=route)
+
+
+class SQLProfilerMiddleware:
+    """Profile the SQL of a request, as enabled by `settings.SQL_PROFILER`.
+
+    Sums up the statements run before the response started in a
+    `Server-Timing` header, and logs every statement with its origin once
+    the request is done, flagging repeated SELECTs as possible N+1 queries.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    def is_enabled(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or settings.SQL_PROFILER == "off":
+            return False
+        if settings.SQL_PROFILER == "always":
+            return True
+        return Headers(scope=scope).get("x-sql-profile", "") not in ("", "0")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.is_enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            profile.log(f"{scope['method']} {scope['path']}")
@@ -2,10 +2,14 @@ from datetime import datetime
 from uuid import UUID, uuid4
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.types import TIMESTAMP
+from sqlalchemy.sql import column
+from sqlalchemy.types import TIMESTAMP, Boolean
 
 from app.utils import date_tz
 
+# predicate for partial indexes that only cover rows not soft deleted
+NOT_DELETED = column("is_deleted", Boolean) == False
+
 
 class Base(DeclarativeBase):
     id: Mapped[UUID] = mapped_column(primary_key=True, default=uuid4, sort_order=-1)
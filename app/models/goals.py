@@ -2,25 +2,47 @@ from typing import TYPE_CHECKING
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy.schema import ForeignKey
-from sqlalchemy.types import String, TIMESTAMP
+from sqlalchemy.schema import ForeignKey, Index
+from sqlalchemy.sql import column
+from sqlalchemy.types import Boolean, String, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models.base import Base
+from app.models.base import NOT_DELETED, Base
 from app.models.users import User
 
 if TYPE_CHECKING:
     from app.models.workouts import Workout
 
+NOT_NOTIFIED = NOT_DELETED & (column("is_notified", Boolean) == False)
+
 
 class Goal(Base):
     __tablename__ = "goal"
+    __table_args__ = (
+        Index(
+            "ix_goal_user_id_created_at",
+            "user_id",
+            "created_at",
+            "id",
+            sqlite_where=NOT_DELETED,
+            postgresql_where=NOT_DELETED,
+        ),
+        Index(
+            "ix_goal_user_id_not_notified",
+            "user_id",
+            sqlite_where=NOT_NOTIFIED,
+            postgresql_where=NOT_NOTIFIED,
+        ),
+    )
+
     target_exercise: Mapped[str] = mapped_column(String(150))
     target_duration: Mapped[int] = mapped_column()
     target_calories: Mapped[float] = mapped_column()
     deadline: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True))
     is_deleted: Mapped[bool] = mapped_column(default=False)
     is_notified: Mapped[bool] = mapped_column(default=False)
+    calories_progress: Mapped[float] = mapped_column(default=0)
+    duration_progress: Mapped[int] = mapped_column(default=0)
 
     # relationship
     user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
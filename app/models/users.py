@@ -1,17 +1,30 @@
 from typing import TYPE_CHECKING
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.types import String
+from sqlalchemy.schema import Index
+from sqlalchemy.sql import column
+from sqlalchemy.types import Boolean, String
 
-from app.models.base import Base
+from app.models.base import NOT_DELETED, Base
 
 if TYPE_CHECKING:
     from app.models.goals import Goal
     from app.models.workouts import Workout
 
+ACTIVE = NOT_DELETED & (column("is_active", Boolean) == True)
+
 
 class User(Base):
     __tablename__ = "user"
+    __table_args__ = (
+        Index(
+            "ix_user_active",
+            "id",
+            sqlite_where=ACTIVE,
+            postgresql_where=ACTIVE,
+        ),
+    )
+
     first_name: Mapped[str] = mapped_column(String(100))
     last_name: Mapped[str] = mapped_column(String(100))
     email: Mapped[str] = mapped_column(String(100), unique=True)
@@ -0,0 +1,22 @@
+from datetime import date
+from uuid import UUID
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.schema import ForeignKey, UniqueConstraint
+from sqlalchemy.types import String
+
+from app.models.base import Base
+
+
+class WorkoutDailyRollup(Base):
+    """Totals of one user's workouts of one exercise on one (UTC) day."""
+
+    __tablename__ = "workout_daily_rollup"
+    __table_args__ = (UniqueConstraint("user_id", "day", "exercise"),)
+
+    user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"))
+    day: Mapped[date] = mapped_column()
+    exercise: Mapped[str] = mapped_column(String(150))
+    calories_burned: Mapped[float] = mapped_column(default=0)
+    duration: Mapped[int] = mapped_column(default=0)
+    workouts: Mapped[int] = mapped_column(default=0)
@@ -2,11 +2,11 @@ from typing import TYPE_CHECKING
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy.schema import ForeignKey
+from sqlalchemy.schema import ForeignKey, Index
 from sqlalchemy.types import String, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.models.base import Base
+from app.models.base import NOT_DELETED, Base
 from app.models.users import User
 from app.utils import date_tz
 
@@ -16,6 +16,33 @@ if TYPE_CHECKING:
 
 class Workout(Base):
     __tablename__ = "workout"
+    __table_args__ = (
+        Index(
+            "ix_workout_user_id_created_at",
+            "user_id",
+            "created_at",
+            "id",
+            sqlite_where=NOT_DELETED,
+            postgresql_where=NOT_DELETED,
+        ),
+        Index(
+            "ix_workout_user_id_exercise_created_at",
+            "user_id",
+            "exercise",
+            "created_at",
+            "id",
+            sqlite_where=NOT_DELETED,
+            postgresql_where=NOT_DELETED,
+        ),
+        Index(
+            "ix_workout_goal_id",
+            "goal_id",
+            "calories_burned",
+            sqlite_where=NOT_DELETED,
+            postgresql_where=NOT_DELETED,
+        ),
+    )
+
     exercise: Mapped[str] = mapped_column(String(150))
     duration: Mapped[int] = mapped_column()
     calories_burned: Mapped[float] = mapped_column(default=0)
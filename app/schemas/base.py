@@ -1,10 +1,13 @@
 from typing import Annotated, TypeVar, Generic
 
 from pydantic import (
+    AfterValidator,
     BaseModel,
     Field,
 )
 
+from app.utils.validators import validate_cursor
+
 T = TypeVar("T")
 
 
@@ -23,10 +26,14 @@ class AppPaginatedResponse(BaseModel, Generic[T]):
     result: list[T]
     page: int
     limit: int
-    total: int
+    total: int | None = None
     status: int
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
 
 
 class PaginationQuery(BaseModel):
     page: Annotated[int, Field(ge=1, le=100)] = 1
     limit: Annotated[int, Field(ge=10, le=100)] = 10
+    cursor: Annotated[str | None, AfterValidator(validate_cursor)] = None
+    include_total: bool = True
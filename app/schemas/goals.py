@@ -1,10 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Annotated
 
-from pydantic import UUID4, AfterValidator, Field
+from pydantic import UUID4, AfterValidator, Field, computed_field
 from pydantic.config import ConfigDict
 from pydantic.main import BaseModel
 
+from app.utils import date_tz
 from app.utils.validators import validate_exercise, validate_goal_deadline
 
 
@@ -18,6 +19,42 @@ class GoalPublic(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class GoalWithProgress(GoalPublic):
+    """A goal with its progress, from the counters kept on the goal row."""
+
+    created_at: datetime
+    calories_progress: float
+    duration_progress: int
+
+    @computed_field
+    @property
+    def remaining_calories(self) -> float:
+        return max(self.target_calories - self.calories_progress, 0)
+
+    @computed_field
+    @property
+    def remaining_duration(self) -> int:
+        return max(self.target_duration - self.duration_progress, 0)
+
+    @computed_field
+    @property
+    def progress_percentage(self) -> float:
+        return round(min(self.calories_progress / self.target_calories, 1) * 100, 1)
+
+    @computed_field
+    @property
+    def projected_completion(self) -> datetime | None:
+        """When the calorie target is reached at the pace kept so far."""
+        if not 0 < self.calories_progress < self.target_calories:
+            return None
+
+        created_at = self.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        elapsed = date_tz.now() - created_at
+        return created_at + elapsed * (self.target_calories / self.calories_progress)
+
+
 class GoalCreate(BaseModel):
     target_exercise: Annotated[
         str, Field(max_length=100, min_length=5), AfterValidator(validate_exercise)
@@ -1,20 +1,40 @@
-from typing import Annotated
+from datetime import date, datetime
+from typing import Annotated, Any, Literal, Self
 
-from pydantic import AfterValidator, Field
+from pydantic import AfterValidator, Field, model_validator
 from pydantic.types import UUID4
 from pydantic.config import ConfigDict
 from pydantic.main import BaseModel
+from pydantic_core import PydanticCustomError
 
-from app.utils.validators import validate_exercise
+from app.utils.validators import validate_exercise, validate_utc
 
 from .base import PaginationQuery
 from .goals import GoalPublic
 
 
+ExerciseFilter = Annotated[
+    str, Field(max_length=100), AfterValidator(validate_exercise)
+]
+
+
 class WorkoutQuery(PaginationQuery):
-    exercise: Annotated[
-        str, Field(max_length=100), AfterValidator(validate_exercise)
-    ] = ""
+    exercise: ExerciseFilter = ""
+
+
+class WorkoutExportQuery(BaseModel):
+    format: Literal["csv", "ndjson"] = "csv"
+    exercise: ExerciseFilter = ""
+    start_date: Annotated[datetime | None, AfterValidator(validate_utc)] = None
+    end_date: Annotated[datetime | None, AfterValidator(validate_utc)] = None
+
+    @model_validator(mode="after")
+    def _check_range(self) -> Self:
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise PydanticCustomError(
+                "date_error", "The start date must not be after the end date"
+            )
+        return self
 
 
 class WorkoutPublic(BaseModel):
@@ -45,3 +65,25 @@ class WorkoutUpdate(BaseModel):
     duration: Annotated[int | None, Field(ge=10, le=120)] = None
     calories_burned: Annotated[float | None, Field(ge=100, le=1000)] = None
     goal_id: UUID4 | None = None
+
+
+class WorkoutStatsQuery(BaseModel):
+    period: Literal["day", "week", "month"] = "day"
+    exercise: ExerciseFilter = ""
+    start_date: date | None = None
+    end_date: date | None = None
+
+
+class WorkoutStats(BaseModel):
+    period_start: date
+    exercise: str
+    calories_burned: float
+    duration: int
+    workouts: int
+
+
+class WorkoutBulkResult(BaseModel):
+    index: int
+    status: int
+    id: UUID4 | None = None
+    errors: Any = None
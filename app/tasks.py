@@ -1,17 +1,40 @@
 import csv
-from datetime import timedelta
+import logging
+import time
+from collections import defaultdict
+from contextvars import Token
+from datetime import datetime, timedelta
 from io import StringIO
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence
+from uuid import UUID, uuid4
+
 import anyio
 
-from celery import Celery
+from celery import Celery, Task, group
+from celery.exceptions import SoftTimeLimitExceeded
 from celery.schedules import crontab
+from celery.signals import task_postrun, task_prerun
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import aget_db
+from app.core.database import aget_db, dispose_engines
+from app.core.redis import close_async_redis, get_redis
 from app.crud import users as user_crud
 from app.crud import goals as goal_crud
 from app.crud import workouts as workout_crud
 from app.utils import date_tz, email_service
+from app.utils.locks import LeaseLock
+from app.utils.metrics import (
+    NOTIFIER_BATCH_SECONDS,
+    NOTIFIER_USERS,
+    TASK_SECONDS,
+    push_metrics,
+)
+from app.utils.shards import ShardCheckpoint, ShardProgress, shard_bounds
+from app.utils.sql_profiler import QueryProfile, current_profile
+
+logger = logging.getLogger(__name__)
 
 celery_app = Celery(
     "tasks", broker=str(settings.REDIS_URI), backend=str(settings.REDIS_URI)
@@ -32,65 +55,363 @@ celery_app.conf.beat_schedule = {
 }
 
 
-async def anotify_user_fitness_goal_achieved():
-    async for session in aget_db():
-        users = await user_crud.get_all_user(session)
-        for user in users:
-            goals = await goal_crud.get_achieved_goals(session, user)
-            if len(goals) > 0:
-                html = "<h2>Fitness Goal Achieved</h2><ul>"
-                for goal in goals:
-                    html += f"<li>{goal.target_exercise}: {goal.target_calories}</li>"
-                html += "</ul>"
+_task_started_at: dict[str, float] = {}
+_task_profiles: dict[str, tuple[QueryProfile, Token]] = {}
 
-                email_service.send_email(user.email, "Fitness Goal Achieved !!!", html)
-                for goal in goals:
-                    goal.is_notified = True
 
-                session.add_all(goals)
-                await session.commit()
+@task_prerun.connect
+def start_task_timer(task_id: str, **kwargs: Any) -> None:
+    _task_started_at[task_id] = time.perf_counter()
 
 
-async def anotify_user_weekly_fitness_resport():
-    today = date_tz.now()
-    if today.weekday() == 6:
-        start_date = date_tz.now() - timedelta(days=7)
-        async for session in aget_db():
-            users = await user_crud.get_all_user(session)
-            for user in users:
-                workouts = await workout_crud.weekly_fitness_trend(
-                    session, user, start_date, today
+@task_prerun.connect
+def start_task_profile(task_id: str, **kwargs: Any) -> None:
+    # runs in the worker thread, so the task's event loop inherits it
+    if settings.SQL_PROFILER == "always":
+        profile = QueryProfile()
+        _task_profiles[task_id] = (profile, current_profile.set(profile))
+
+
+@task_postrun.connect
+def log_task_profile(task_id: str, task: Task, **kwargs: Any) -> None:
+    if task_id in _task_profiles:
+        profile, token = _task_profiles.pop(task_id)
+        current_profile.reset(token)
+        profile.log(f"task {task.name}")
+
+
+@task_postrun.connect
+def record_task_metrics(
+    task_id: str, task: Task, state: str | None = None, **kwargs: Any
+) -> None:
+    started_at = _task_started_at.pop(task_id, None)
+    if started_at is not None:
+        TASK_SECONDS.observe(
+            time.perf_counter() - started_at,
+            task=task.name,
+            state=state or "UNKNOWN",
+        )
+
+    # workers don't serve /metrics, the API renders what they push
+    try:
+        push_metrics(get_redis())
+    except RedisError:
+        logger.warning("Could not push task metrics", exc_info=True)
+
+
+async def send_goal_achieved_email(
+    email: str,
+    goals: Sequence[Any],
+    notified: list[UUID],
+    mailer: email_service.EmailBackend,
+) -> None:
+    html = "<h2>Fitness Goal Achieved</h2><ul>"
+    for goal in goals:
+        html += f"<li>{goal.target_exercise}: {goal.target_calories}</li>"
+    html += "</ul>"
+
+    message = email_service.build_message(email, "Fitness Goal Achieved !!!", html)
+    try:
+        await email_service.send_email(mailer, message)
+    except Exception:
+        # left unnotified so the next run tries again
+        logger.exception("Failed to send goal achieved email to %s", email)
+        return
+
+    notified.extend(goal.id for goal in goals)
+
+
+async def notify_goals_achieved(
+    session: AsyncSession,
+    mailer: email_service.EmailBackend,
+    after_user_id: UUID | None = None,
+    before_user_id: UUID | None = None,
+    on_batch_done: Callable[[UUID], None] | None = None,
+) -> None:
+    while True:
+        start = time.perf_counter()
+        goals = await goal_crud.get_achieved_goals_batch(
+            session, after_user_id, settings.NOTIFY_BATCH_SIZE, before_user_id
+        )
+        if not goals:
+            break
+
+        after_user_id = goals[-1].user_id
+        goals_by_email = defaultdict(list)
+        for goal in goals:
+            goals_by_email[goal.email].append(goal)
+
+        notified: list[UUID] = []
+        async with anyio.create_task_group() as tg:
+            for email, user_goals in goals_by_email.items():
+                tg.start_soon(
+                    send_goal_achieved_email, email, user_goals, notified, mailer
                 )
 
-                if len(workouts) > 0:
-                    html = "<h2>Fitness Weekly Report</h2><p>We have prepared weekly report for you.</p>"
-                    buffer = StringIO()
-                    writer = csv.writer(buffer)
-                    header_vals = ["Date", "Calories", "Duration"]
-                    writer.writerow(header_vals)
-                    for workout in workouts:
-                        writer.writerow(
-                            [
-                                workout.created_at.date(),
-                                workout.calories_burned,
-                                workout.duration,
-                            ]
-                        )
-                    email_service.send_email(
-                        user.email, "Fitness Weekly Report !!!", html, buffer
-                    )
-                else:
-                    html = "<h2>Fitness Weekly Report</h2><p>You haven't done any workout this week./p>"
-                    email_service.send_email(
-                        user.email, "Fitness Weekly Report !!!", html
-                    )
+        if notified:
+            await goal_crud.mark_goals_notified(session, notified)
+
+        NOTIFIER_USERS.inc(len(goals_by_email), job="goals_achieved")
+        NOTIFIER_BATCH_SECONDS.observe(
+            time.perf_counter() - start, job="goals_achieved"
+        )
+        if on_batch_done is not None:
+            on_batch_done(after_user_id)
+
+
+async def anotify_user_fitness_goal_achieved(
+    after_user_id: UUID | None = None,
+    before_user_id: UUID | None = None,
+    on_batch_done: Callable[[UUID], None] | None = None,
+):
+    async with email_service.get_email_backend() as mailer:
+        async for session in aget_db():
+            await notify_goals_achieved(
+                session, mailer, after_user_id, before_user_id, on_batch_done
+            )
+
+
+async def build_weekly_reports(
+    workouts: AsyncIterator[Any],
+) -> AsyncIterator[tuple[UUID, StringIO]]:
+    """Write one CSV per user, yielding each as soon as its last row is in.
+
+    Expects the rows grouped by user, as streamed by the workout CRUD.
+    """
+    user_id = None
+    report = StringIO()
+    writer = csv.writer(report)
+    async for workout in workouts:
+        if workout.user_id != user_id:
+            if user_id is not None:
+                yield user_id, report
+
+            user_id = workout.user_id
+            report = StringIO()
+            writer = csv.writer(report)
+            writer.writerow(["Date", "Calories", "Duration"])
+
+        writer.writerow(
+            [workout.created_at.date(), workout.calories_burned, workout.duration]
+        )
+
+    if user_id is not None:
+        yield user_id, report
+
+
+async def send_weekly_report(
+    email: str, report: StringIO | None, mailer: email_service.EmailBackend
+) -> None:
+    if report is not None:
+        html = "<h2>Fitness Weekly Report</h2><p>We have prepared weekly report for you.</p>"
+    else:
+        html = "<h2>Fitness Weekly Report</h2><p>You haven't done any workout this week.</p>"
+
+    message = email_service.build_message(
+        email, "Fitness Weekly Report !!!", html, report
+    )
+    try:
+        await email_service.send_email(mailer, message)
+    except Exception:
+        logger.exception("Failed to send weekly report to %s", email)
+
+
+async def notify_weekly_reports(
+    session: AsyncSession,
+    mailer: email_service.EmailBackend,
+    start_date: datetime,
+    end_date: datetime,
+    after_user_id: UUID | None = None,
+    before_user_id: UUID | None = None,
+    on_batch_done: Callable[[UUID], None] | None = None,
+) -> None:
+    while True:
+        start = time.perf_counter()
+        users = await user_crud.get_active_users_batch(
+            session, after_user_id, settings.NOTIFY_BATCH_SIZE, before_user_id
+        )
+        if not users:
+            break
+
+        after_user_id = users[-1].id
+        emails = {user.id: user.email for user in users}
+        workouts = workout_crud.stream_weekly_fitness_trend(
+            session, list(emails), start_date, end_date
+        )
+
+        async with anyio.create_task_group() as tg:
+            async for user_id, report in build_weekly_reports(workouts):
+                tg.start_soon(send_weekly_report, emails.pop(user_id), report, mailer)
+
+            for email in emails.values():
+                tg.start_soon(send_weekly_report, email, None, mailer)
+
+        NOTIFIER_USERS.inc(len(users), job="weekly_report")
+        NOTIFIER_BATCH_SECONDS.observe(time.perf_counter() - start, job="weekly_report")
+        if on_batch_done is not None:
+            on_batch_done(after_user_id)
+
+
+async def anotify_user_weekly_fitness_resport(
+    start_date: datetime,
+    end_date: datetime,
+    after_user_id: UUID | None = None,
+    before_user_id: UUID | None = None,
+    on_batch_done: Callable[[UUID], None] | None = None,
+):
+    async with email_service.get_email_backend() as mailer:
+        async for session in aget_db():
+            await notify_weekly_reports(
+                session,
+                mailer,
+                start_date,
+                end_date,
+                after_user_id,
+                before_user_id,
+                on_batch_done,
+            )
+
+
+def dispatch_shards(shard_task: Task, *args: Any) -> str:
+    """Enqueue one `shard_task` per slice of the user id space."""
+    run_id = uuid4().hex
+    shard_count = settings.NOTIFY_SHARD_COUNT
+    group(
+        shard_task.s(run_id, shard, shard_count, *args) for shard in range(shard_count)
+    ).apply_async()
+    logger.info(
+        "Dispatched %s run %s in %d shards", shard_task.name, run_id, shard_count
+    )
+    return run_id
+
+
+async def run_in_fresh_loop(job: Callable[..., Awaitable[Any]], *args: Any) -> None:
+    """Await `job`, then close the connections it pooled.
+
+    Every shard runs in its own event loop, and asyncpg connections and the
+    async Redis client can't be reused from another loop.
+    """
+    try:
+        await job(*args)
+    finally:
+        await dispose_engines()
+        await close_async_redis()
+
+
+def run_shard(
+    task: Task,
+    run_id: str,
+    shard: int,
+    shard_count: int,
+    job: Callable[..., Awaitable[Any]],
+    *args: Any,
+    once_per: str | None = None,
+) -> None:
+    """Run `job` over one shard of users, unless another run holds the shard.
+
+    Overlapping runs of the same shard are skipped rather than stacked. Each
+    finished batch is checkpointed, so a run cut short by the time limit is
+    resumed by the next one. With `once_per`, the shard completes once per
+    that scope (e.g. a report week) instead of starting over every run.
+    """
+    progress = ShardProgress(task.name, run_id)
+    if progress.get(shard) == ShardProgress.DONE:
+        # redelivered after it already finished
+        return
+
+    lock = LeaseLock(
+        f"lock:{task.name}:{shard}/{shard_count}", settings.NOTIFY_LOCK_TTL
+    )
+    if not lock.acquire():
+        logger.info("Skipping %s shard %d held by a previous run", task.name, shard)
+        progress.set(shard, ShardProgress.SKIPPED)
+        return
+
+    try:
+        scope = f"{task.name}:{once_per}" if once_per else task.name
+        checkpoint = ShardCheckpoint(scope, shard, shard_count)
+        if checkpoint.is_complete():
+            progress.set(shard, ShardProgress.DONE)
+            return
+
+        after_user_id, before_user_id = shard_bounds(shard, shard_count)
+        after_user_id = checkpoint.get() or after_user_id
+
+        progress.set(shard, ShardProgress.RUNNING)
+        anyio.run(
+            run_in_fresh_loop, job, *args, after_user_id, before_user_id, checkpoint.set
+        )
+    except Exception as error:
+        progress.set(shard, f"{ShardProgress.FAILED}: {error!r}")
+        raise
+    finally:
+        lock.release()
+
+    if once_per:
+        checkpoint.complete()
+    else:
+        checkpoint.clear()
+    progress.set(shard, ShardProgress.DONE)
+
+
+def retry_failed_shards(shard_task: Task, run_id: str, *args: Any) -> list[int]:
+    """Re-enqueue only the shards of `run_id` that ended up failed."""
+    shards = ShardProgress(shard_task.name, run_id).failed()
+    for shard in shards:
+        shard_task.delay(run_id, shard, settings.NOTIFY_SHARD_COUNT, *args)
+    return shards
+
+
+shard_task_options = {
+    "bind": True,
+    "acks_late": True,
+    "autoretry_for": (Exception,),
+    # a timed out shard resumes from its checkpoint on the next beat instead
+    "dont_autoretry_for": (SoftTimeLimitExceeded,),
+    "retry_backoff": True,
+    "max_retries": 3,
+    "soft_time_limit": settings.NOTIFY_SHARD_TIME_LIMIT,
+}
+
+
+@celery_app.task(**shard_task_options)
+def notify_user_fitness_goal_achieved_shard(
+    self: Task, run_id: str, shard: int, shard_count: int
+):
+    run_shard(self, run_id, shard, shard_count, anotify_user_fitness_goal_achieved)
+
+
+@celery_app.task(**shard_task_options)
+def notify_user_weekly_fitness_resport_shard(
+    self: Task, run_id: str, shard: int, shard_count: int, start: str, end: str
+):
+    start_date, end_date = datetime.fromisoformat(start), datetime.fromisoformat(end)
+    run_shard(
+        self,
+        run_id,
+        shard,
+        shard_count,
+        anotify_user_weekly_fitness_resport,
+        start_date,
+        end_date,
+        once_per=start_date.date().isoformat(),
+    )
 
 
 @celery_app.task()
 def notify_user_fitness_goal_achieved():
-    anyio.run(anotify_user_fitness_goal_achieved)
+    dispatch_shards(notify_user_fitness_goal_achieved_shard)
 
 
 @celery_app.task()
 def notify_user_weekly_fitness_resport():
-    anyio.run(anotify_user_weekly_fitness_resport)
+    today = date_tz.now()
+    if today.weekday() != 6:
+        return
+
+    start_date = today - timedelta(days=7)
+    dispatch_shards(
+        notify_user_weekly_fitness_resport_shard,
+        start_date.isoformat(),
+        today.isoformat(),
+    )
@@ -0,0 +1,63 @@
+import json
+from typing import Any
+
+from fastapi import Request, status
+from fastapi.exceptions import HTTPException
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class InvalidItem(ValueError):
+    """An NDJSON line that is not valid JSON."""
+
+
+def _too_many_items(max_items: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"At most {max_items} items can be sent at once",
+    )
+
+
+async def read_json_items(request: Request, max_items: int) -> list[Any]:
+    """Read a request body holding a JSON array or NDJSON, one item per line.
+
+    NDJSON is parsed as it streams in. A line that isn't valid JSON becomes
+    an `InvalidItem`, so the rest of the batch can still be processed.
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith(NDJSON_MEDIA_TYPE):
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON"
+            )
+        if not isinstance(body, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array",
+            )
+        if len(body) > max_items:
+            raise _too_many_items(max_items)
+        return body
+
+    items: list[Any] = []
+
+    def add_line(line: bytes) -> None:
+        if not line.strip():
+            return
+        if len(items) == max_items:
+            raise _too_many_items(max_items)
+        try:
+            items.append(json.loads(line))
+        except ValueError as error:
+            items.append(InvalidItem(str(error)))
+
+    buffer = b""
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            add_line(line)
+
+    add_line(buffer)
+    return items
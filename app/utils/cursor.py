@@ -0,0 +1,35 @@
+import base64
+import json
+from datetime import datetime
+from typing import Literal, NamedTuple
+from uuid import UUID
+
+CursorDirection = Literal["next", "prev"]
+
+
+class Cursor(NamedTuple):
+    created_at: datetime
+    id: UUID
+    direction: CursorDirection = "next"
+
+
+def encode_cursor(created_at: datetime, id: UUID, direction: CursorDirection) -> str:
+    payload = {"c": created_at.isoformat(), "i": id.hex, "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = payload["d"]
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return Cursor(
+            created_at=datetime.fromisoformat(payload["c"]),
+            id=UUID(hex=payload["i"]),
+            direction=direction,
+        )
+    except (ValueError, TypeError, KeyError) as error:
+        raise ValueError("Invalid cursor") from error
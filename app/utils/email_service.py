@@ -1,33 +1,207 @@
-from io import StringIO
 import logging
-import emails
+import smtplib
+from abc import ABC, abstractmethod
+import time
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from io import StringIO
+from pathlib import Path
+
+import anyio
+import anyio.to_thread
 
 from app.core.config import settings
+from app.utils.metrics import EMAIL_SEND_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# messages delivered by the memory backend, for tests to inspect
+outbox: list[EmailMessage] = []
 
-def send_email(
+
+def build_message(
     email_to: str,
     subject: str = "",
     html_content: str = "",
     attachment: StringIO | None = None,
-) -> None:
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = formataddr(
+        (settings.EMAILS_FROM_NAME or "", settings.EMAILS_FROM_EMAIL or "")
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    smtp_options["tls"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
+    message["To"] = email_to
+    message["Message-ID"] = make_msgid()
+    message.set_content(html_content, subtype="html")
 
     if attachment:
-        attachment.seek(0)
-        message.attach(filename="report.csv", data=attachment)
+        message.add_attachment(
+            attachment.getvalue(), subtype="csv", filename="report.csv"
+        )
+
+    return message
+
+
+class EmailBackend(ABC):
+    @abstractmethod
+    async def send(self, message: EmailMessage) -> None: ...
+
+    async def aclose(self) -> None:
+        pass
+
+    async def __aenter__(self) -> "EmailBackend":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+class MemoryBackend(EmailBackend):
+    async def send(self, message: EmailMessage) -> None:
+        outbox.append(message)
+
+
+class FileBackend(EmailBackend):
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    async def send(self, message: EmailMessage) -> None:
+        await anyio.to_thread.run_sync(self._write, message)
+
+    def _write(self, message: EmailMessage) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        name = message["Message-ID"].strip("<>").replace("@", "_")
+        (self.path / f"{name}.eml").write_bytes(message.as_bytes())
+
 
-    response = message.send(to=email_to, smtp=smtp_options)
-    logger.info(f"send email result: {response}")
+def is_transient_error(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, OSError))
+
+
+class SMTPBackend(EmailBackend):
+    """Delivers over a small pool of long-lived SMTP sessions.
+
+    Each send borrows an idle connection (or opens one), so the TLS
+    handshake and login are paid once per connection rather than per
+    message. smtplib is blocking, so sends run in worker threads, at most
+    `pool_size` at a time.
+    """
+
+    def __init__(
+        self,
+        host: str | None,
+        port: int,
+        user: str | None = None,
+        password: str | None = None,
+        tls: bool = True,
+        timeout: float = 10,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.tls = tls
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._idle: list[smtplib.SMTP] = []
+        self._limiter: anyio.CapacityLimiter | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host or "", self.port, timeout=self.timeout)
+        try:
+            if self.tls:
+                connection.starttls()
+            if self.user and self.password:
+                connection.login(self.user, self.password)
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def _send(self, message: EmailMessage) -> None:
+        # sends run in parallel threads, so another one may take the last idle
+        # connection between a check and the pop
+        try:
+            connection = self._idle.pop()
+        except IndexError:
+            connection = self._connect()
+        try:
+            connection.send_message(message)
+        except Exception:
+            connection.close()
+            raise
+
+        self._idle.append(connection)
+
+    async def send(self, message: EmailMessage) -> None:
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.pool_size)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                await anyio.to_thread.run_sync(
+                    self._send, message, limiter=self._limiter
+                )
+            except Exception as error:
+                if attempt == self.max_retries or not is_transient_error(error):
+                    raise
+                logger.warning("Retrying email to %s after %r", message["To"], error)
+                await anyio.sleep(self.retry_backoff * 2**attempt)
+            else:
+                logger.debug("Sent email to %s", message["To"])
+                return
+
+    def _close(self) -> None:
+        while True:
+            try:
+                connection = self._idle.pop()
+            except IndexError:
+                return
+            try:
+                connection.quit()
+            except (smtplib.SMTPException, OSError):
+                connection.close()
+
+    async def aclose(self) -> None:
+        await anyio.to_thread.run_sync(self._close)
+
+
+async def send_email(mailer: EmailBackend, message: EmailMessage) -> None:
+    """`mailer.send`, timed into the email metrics."""
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        await mailer.send(message)
+        outcome = "sent"
+    finally:
+        EMAIL_SEND_SECONDS.observe(
+            time.perf_counter() - start,
+            backend=type(mailer).__name__,
+            outcome=outcome,
+        )
+
+
+def get_email_backend() -> EmailBackend:
+    if settings.EMAIL_BACKEND == "memory":
+        return MemoryBackend()
+    elif settings.EMAIL_BACKEND == "file":
+        return FileBackend(settings.EMAIL_FILE_PATH)
+
+    return SMTPBackend(
+        host=settings.SMTP_HOST,
+        port=settings.SMTP_PORT,
+        user=settings.SMTP_USER,
+        password=settings.SMTP_PASSWORD,
+        tls=settings.SMTP_TLS,
+        timeout=settings.SMTP_TIMEOUT,
+        pool_size=settings.EMAIL_CONCURRENCY,
+        max_retries=settings.SMTP_MAX_RETRIES,
+        retry_backoff=settings.SMTP_RETRY_BACKOFF,
+    )
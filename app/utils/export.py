@@ -0,0 +1,35 @@
+import csv
+from io import StringIO
+from typing import Any, AsyncIterator
+
+from pydantic_core import to_json
+
+# rows buffered into each chunk sent to the client
+CHUNK_ROWS = 500
+
+
+async def iter_csv(rows: AsyncIterator[Any], header: list[str]) -> AsyncIterator[str]:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    count = 0
+    async for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+async def iter_ndjson(rows: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    chunk: list[bytes] = []
+    async for row in rows:
+        chunk.append(to_json(row._asdict()) + b"\n")
+        if len(chunk) == CHUNK_ROWS:
+            yield b"".join(chunk)
+            chunk.clear()
+
+    yield b"".join(chunk)
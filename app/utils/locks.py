@@ -0,0 +1,61 @@
+import logging
+import threading
+import time
+
+from redis.exceptions import LockError, RedisError
+from redis.lock import Lock
+
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLock:
+    """Non-blocking Redis lock whose lease is renewed while it is held.
+
+    A background thread extends the lease every third of `ttl`, so a long
+    job keeps the lock, while a crashed worker loses it within `ttl`.
+    """
+
+    def __init__(self, name: str, ttl: float) -> None:
+        self.name = name
+        self.ttl = ttl
+        self._lock = Lock(get_redis(), name, timeout=ttl, thread_local=False)
+        self._stop = threading.Event()
+        self._heartbeat: threading.Thread | None = None
+
+    def acquire(self) -> bool:
+        if not self._lock.acquire(blocking=False):
+            return False
+
+        self._heartbeat = threading.Thread(target=self._renew, daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renew(self) -> None:
+        renewed_at = time.monotonic()
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self._lock.reacquire()
+            except LockError:
+                logger.warning("Lost the lease on %s", self.name)
+                return
+            except RedisError:
+                # a blip only costs the lease once it outlasts the last renewal
+                if time.monotonic() - renewed_at >= self.ttl:
+                    logger.warning("Lost the lease on %s", self.name, exc_info=True)
+                    return
+                logger.info("Retrying the lease renewal of %s", self.name)
+            else:
+                renewed_at = time.monotonic()
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+
+        try:
+            self._lock.release()
+        except LockError:
+            # the lease already expired, possibly taken over by another run
+            pass
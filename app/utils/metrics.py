@@ -0,0 +1,322 @@
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+
+import anyio
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# label values -> value, or for a histogram label values + a sample suffix
+Values = dict[tuple[str, ...], float]
+
+
+class Metric:
+    """A metric kept in process and rendered in the Prometheus text format.
+
+    Values only ever add up, so every process pushes what it recorded to
+    Redis (see `push_metrics`), where the sums of all processes are rendered.
+    """
+
+    type = "untyped"
+    pushed = True
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: defaultdict[tuple[str, ...], float] = defaultdict(float)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _labelvalues(self, labels: dict[str, object]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _add(self, key: tuple[str, ...], amount: float) -> None:
+        with self._lock:
+            self._values[key] += amount
+
+    def collect(self) -> Values:
+        with self._lock:
+            return dict(self._values)
+
+    def drain(self) -> Values:
+        """The values recorded so far, resetting them."""
+        with self._lock:
+            values = dict(self._values)
+            self._values.clear()
+        return values
+
+    def restore(self, values: Values) -> None:
+        """Add back drained values that could not be pushed."""
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] += value
+
+    def _format(self, suffix: str, labels: dict[str, str], value: float) -> str:
+        if labels:
+            pairs = ",".join(
+                f'{name}="{_escape(label)}"' for name, label in labels.items()
+            )
+            return f"{self.name}{suffix}{{{pairs}}} {_number(value)}"
+        return f"{self.name}{suffix} {_number(value)}"
+
+    def samples(self, values: Values) -> Iterator[str]:
+        for labelvalues, value in sorted(values.items()):
+            yield self._format("", dict(zip(self.labelnames, labelvalues)), value)
+
+    def render(self, values: Values) -> Iterator[str]:
+        yield f"# HELP {self.name} {_escape(self.documentation)}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples(values)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        self._add(self._labelvalues(labels), amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+
+    def observe(self, value: float, **labels: object) -> None:
+        labelvalues = self._labelvalues(labels)
+        bucket = next(
+            index for index, bound in enumerate(self.buckets) if value <= bound
+        )
+        with self._lock:
+            # buckets are kept per range and only summed up when rendered
+            self._values[(*labelvalues, str(bucket))] += 1
+            self._values[(*labelvalues, "sum")] += value
+            self._values[(*labelvalues, "count")] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self, values: Values) -> Iterator[str]:
+        series: defaultdict[tuple[str, ...], dict[str, float]] = defaultdict(dict)
+        for (*labelvalues, field), value in values.items():
+            series[tuple(labelvalues)][field] = value
+
+        for labelvalues, fields in sorted(series.items()):
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += fields.get(str(index), 0)
+                yield self._format(
+                    "_bucket", {**labels, "le": _number(bound)}, cumulative
+                )
+            yield self._format("_sum", labels, fields.get("sum", 0))
+            yield self._format("_count", labels, fields.get("count", 0))
+
+
+class Gauge(Metric):
+    """A gauge read from `callback` when rendered, as label values -> value."""
+
+    type = "gauge"
+    # a reading of the process that renders it, never shared
+    pushed = False
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str],
+        callback: Callable[[], Values],
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self) -> Values:
+        return self.callback()
+
+    def drain(self) -> Values:
+        return {}
+
+
+REGISTRY: list[Metric] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _redis_key(metric: Metric) -> str:
+    return f"metrics:{metric.name}"
+
+
+def _drain() -> list[tuple[Metric, Values]]:
+    return [(metric, metric.drain()) for metric in REGISTRY if metric.pushed]
+
+
+def _restore(drained: list[tuple[Metric, Values]]) -> None:
+    for metric, values in drained:
+        metric.restore(values)
+
+
+def push_metrics(redis: Redis) -> None:
+    """Move this process's values into Redis, where `render` picks them up."""
+    drained = _drain()
+    try:
+        with redis.pipeline() as pipe:
+            for metric, values in drained:
+                for key, value in values.items():
+                    pipe.hincrbyfloat(_redis_key(metric), json.dumps(key), value)
+            pipe.execute()
+    except RedisError:
+        _restore(drained)
+        raise
+
+
+async def apush_metrics(redis: AsyncRedis) -> None:
+    """`push_metrics` for the API processes."""
+    drained = _drain()
+    try:
+        async with redis.pipeline() as pipe:
+            for metric, values in drained:
+                for key, value in values.items():
+                    pipe.hincrbyfloat(_redis_key(metric), json.dumps(key), value)
+            await pipe.execute()
+    except RedisError:
+        _restore(drained)
+        raise
+
+
+async def push_metrics_every(
+    interval: float, get_redis: Callable[[], AsyncRedis]
+) -> None:
+    """Push this process's values every `interval` seconds, and once more
+    when cancelled, e.g. on shutdown.
+    """
+    try:
+        while True:
+            await anyio.sleep(interval)
+            await _try_push(get_redis())
+    finally:
+        with anyio.CancelScope(shield=True):
+            await _try_push(get_redis())
+
+
+async def _try_push(redis: AsyncRedis) -> None:
+    try:
+        await apush_metrics(redis)
+    except RedisError:
+        logger.warning("Could not push metrics", exc_info=True)
+
+
+async def get_shared_values(redis: AsyncRedis) -> dict[str, Values]:
+    async with redis.pipeline(transaction=False) as pipe:
+        for metric in REGISTRY:
+            pipe.hgetall(_redis_key(metric))
+        hashes = await pipe.execute()
+
+    return {
+        metric.name: {
+            tuple(json.loads(key)): float(value) for key, value in values.items()
+        }
+        for metric, values in zip(REGISTRY, hashes)
+    }
+
+
+def render(shared: dict[str, Values] | None = None) -> str:
+    """Every registered metric in the Prometheus text format, version 0.0.4.
+
+    With `shared`, pushed metrics are rendered from it alone, so whichever
+    process answers a scrape reports the same totals. Without it, e.g. when
+    Redis is down, they fall back to this process's values.
+    """
+    lines: list[str] = []
+    for metric in REGISTRY:
+        values = metric.collect() if shared is None or not metric.pushed else {}
+        for key, value in (shared or {}).get(metric.name, {}).items():
+            values[key] = values.get(key, 0) + value
+        lines.extend(metric.render(values))
+    return "\n".join(lines) + "\n"
+
+
+# Metrics recorded outside the API process must be declared here, where
+# every process registers them, so `render` knows them from the shared
+# values alone.
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route id.",
+    ["route", "method", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time by operation.",
+    ["operation"],
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt time per call, not counting the wait for a worker thread.",
+    ["operation"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "bcrypt calls refused with a 503 because the queue was full.",
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "email_send_duration_seconds",
+    "Email send latency by backend and outcome.",
+    ["backend", "outcome"],
+)
+NOTIFIER_USERS = Counter(
+    "notifier_users_total",
+    "Users processed by the notifier tasks.",
+    ["job"],
+)
+NOTIFIER_BATCH_SECONDS = Histogram(
+    "notifier_batch_duration_seconds",
+    "Time to process one notifier batch.",
+    ["job"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+TASK_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time by task and final state.",
+    ["task", "state"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
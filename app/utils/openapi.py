@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+import json
+import logging
+import re
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI, Request, Response
+from fastapi.openapi.utils import get_openapi
+from fastapi.routing import APIRoute
+from pydantic_core import to_json
+
+from app.core.config import settings
+from app.utils.response_cache import etag_matches
+
+logger = logging.getLogger(__name__)
+
+# (path, method, operation id) of every documented operation
+Operations = frozenset[tuple[str, str, str]]
+
+_REFUSED = re.compile(r"\s*q\s*=\s*0(\.0*)?\s*")
+
+# the code the routes and their models are declared in
+_SOURCE = Path(__file__).resolve().parents[1]
+
+
+def build_openapi(app: FastAPI) -> dict[str, Any]:
+    schema = get_openapi(
+        title=app.title,
+        version=app.version,
+        openapi_version=app.openapi_version,
+        summary=app.summary,
+        description=app.description,
+        terms_of_service=app.terms_of_service,
+        contact=app.contact,
+        license_info=app.license_info,
+        routes=app.routes,
+        webhooks=app.webhooks.routes,
+        tags=app.openapi_tags,
+        servers=app.servers,
+        separate_input_output_schemas=app.separate_input_output_schemas,
+    )
+    schema["info"]["x-fingerprint"] = schema_fingerprint(app)
+    return schema
+
+
+def app_operations(app: FastAPI) -> Operations:
+    return frozenset(
+        (route.path_format, method.lower(), route.operation_id or route.unique_id)
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.include_in_schema
+        for method in route.methods
+    )
+
+
+def schema_fingerprint(app: FastAPI) -> str:
+    """Identifies the inputs of `build_openapi`: the app's metadata and
+    operations, the source declaring them and the libraries rendering them.
+    """
+    digest = hashlib.sha256()
+    metadata = [
+        app.title,
+        app.version,
+        app.openapi_version,
+        app.summary,
+        app.description,
+        app.terms_of_service,
+        app.contact,
+        app.license_info,
+        app.openapi_tags,
+        app.servers,
+        app.separate_input_output_schemas,
+        sorted(app_operations(app)),
+        version("fastapi"),
+        version("pydantic"),
+    ]
+    digest.update(to_json(metadata, fallback=repr))
+    for path in sorted(_SOURCE.rglob("*.py")):
+        digest.update(path.relative_to(_SOURCE).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:32]
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return not _REFUSED.fullmatch(params)
+    return False
+
+
+class OpenAPIDocument:
+    """The app's OpenAPI schema, encoded and gzipped once, served with an ETag.
+
+    Built on the first request, or read from `settings.OPENAPI_SCHEMA_FILE`
+    when that file was built from the same app, source and libraries.
+    Rebuilt only when the app's routes change.
+    """
+
+    def __init__(self, app: FastAPI) -> None:
+        self.app = app
+        self.operations: Operations | None = None
+        self.body = b""
+        self.gzipped = b""
+        self.etag = ""
+
+    def _load(self) -> bytes:
+        path = settings.OPENAPI_SCHEMA_FILE
+        if path:
+            try:
+                body = Path(path).read_bytes()
+                info = json.loads(body).get("info", {})
+                if info.get("x-fingerprint") == schema_fingerprint(self.app):
+                    return body
+                logger.warning("%s was built from other code, rebuilding", path)
+            except (OSError, ValueError, AttributeError):
+                logger.warning("Could not read %s", path, exc_info=True)
+        return to_json(build_openapi(self.app))
+
+    def refresh(self) -> None:
+        operations = app_operations(self.app)
+        if operations == self.operations:
+            return
+
+        self.body = self._load()
+        self.gzipped = gzip.compress(self.body, mtime=0)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.operations = operations
+
+    def respond(self, request: Request) -> Response:
+        self.refresh()
+        # each encoding is its own representation, with its own ETag
+        etags = {"identity": f'"{self.etag}"', "gzip": f'"{self.etag}-gzip"'}
+        encoding = (
+            "gzip"
+            if accepts_gzip(request.headers.get("accept-encoding", ""))
+            else "identity"
+        )
+        headers = {
+            "ETag": etags[encoding],
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and any(
+            etag_matches(if_none_match, etag) for etag in etags.values()
+        ):
+            return Response(status_code=304, headers=headers)
+
+        body = self.body
+        if encoding == "gzip":
+            headers["Content-Encoding"] = "gzip"
+            body = self.gzipped
+        return Response(body, media_type="application/json", headers=headers)
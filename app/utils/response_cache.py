@@ -0,0 +1,180 @@
+import hashlib
+import logging
+import time
+from uuid import UUID
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# bumped for every user at once, e.g. after recomputing all goal progress
+ALL_USERS = "all"
+
+_versions: TTLCache[str, int] = TTLCache(
+    settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL
+)
+_bodies: TTLCache[str, bytes] = TTLCache(
+    settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL
+)
+# version keys this worker could neither bump nor drop, so their cached
+# responses may be stale until the version would have expired anyway
+_uncacheable: TTLCache[str, bool] = TTLCache(
+    settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL
+)
+
+
+def _version_key(scope: UUID | str) -> str:
+    return f"response_version:{scope}"
+
+
+async def get_version(user_id: UUID) -> str | None:
+    """The user's data version, or None when responses can't be cached.
+
+    Versions only grow, and a version that expired or was lost restarts
+    from the current time, so an old ETag never matches again.
+    """
+    if settings.RESPONSE_CACHE == "off":
+        return None
+
+    keys = [_version_key(user_id), _version_key(ALL_USERS)]
+    if any(_uncacheable.get(key) for key in keys):
+        return None
+
+    if settings.RESPONSE_CACHE == "memory":
+        versions = []
+        for key in keys:
+            version = _versions.get(key)
+            if version is None:
+                version = time.time_ns()
+                _versions.set(key, version)
+            versions.append(version)
+        return ".".join(map(str, versions))
+
+    redis = get_async_redis()
+    try:
+        versions = await redis.mget(keys)
+        for index, key in enumerate(keys):
+            if versions[index] is None:
+                await redis.set(
+                    key, time.time_ns(), nx=True, ex=settings.RESPONSE_CACHE_TTL
+                )
+                versions[index] = await redis.get(key)
+    except RedisError:
+        logger.warning("Response cache unavailable", exc_info=True)
+        return None
+    return ".".join(versions)
+
+
+async def bump_version(user_id: UUID | str) -> None:
+    """Invalidate the cached responses of a user, after a commit.
+
+    Fails closed: when the version can't be bumped it is dropped, and when
+    Redis can't be reached at all the user's responses stop being cached.
+    """
+    key = _version_key(user_id)
+    if settings.RESPONSE_CACHE == "memory":
+        _versions.set(key, max((_versions.get(key) or 0) + 1, time.time_ns()))
+    elif settings.RESPONSE_CACHE == "redis":
+        try:
+            async with get_async_redis().pipeline() as pipe:
+                pipe.set(key, time.time_ns(), nx=True)
+                pipe.incr(key)
+                pipe.expire(key, settings.RESPONSE_CACHE_TTL)
+                await pipe.execute()
+        except RedisError:
+            logger.warning("Could not bump %s, dropping it", key, exc_info=True)
+            try:
+                await get_async_redis().delete(key)
+            except RedisError:
+                logger.error("Could not invalidate cached responses", exc_info=True)
+                _uncacheable.set(key, True)
+
+
+async def bump_all_versions() -> None:
+    await bump_version(ALL_USERS)
+
+
+async def _get_body(etag: str) -> bytes | None:
+    if settings.RESPONSE_CACHE_BODIES == "memory":
+        return _bodies.get(etag)
+    elif settings.RESPONSE_CACHE_BODIES == "redis":
+        try:
+            body = await get_async_redis().get(f"response:{etag}")
+        except RedisError:
+            logger.warning("Response cache unavailable", exc_info=True)
+            return None
+        return body.encode() if body is not None else None
+    return None
+
+
+async def _set_body(etag: str, body: bytes) -> None:
+    if settings.RESPONSE_CACHE_BODIES == "memory":
+        _bodies.set(etag, body)
+    elif settings.RESPONSE_CACHE_BODIES == "redis":
+        try:
+            await get_async_redis().set(
+                f"response:{etag}", body.decode(), ex=settings.RESPONSE_CACHE_TTL
+            )
+        except RedisError:
+            logger.warning("Response cache unavailable", exc_info=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags or "*" in tags
+
+
+class ResponseCache:
+    """Conditional GETs of a user's data, keyed on the user's data version.
+
+    The ETag covers the user, the version and the request URL, so a poll
+    that sends back a current ETag gets a 304 before the database is read.
+    """
+
+    def __init__(self, request: Request, user_id: UUID) -> None:
+        self.request = request
+        self.user_id = user_id
+        self.etag: str | None = None
+
+    async def lookup(self) -> Response | None:
+        """A 304 or a cached body when either fits, None otherwise."""
+        version = await get_version(self.user_id)
+        if version is None:
+            return None
+
+        url = self.request.url
+        digest = hashlib.sha256(
+            f"{self.user_id}:{version}:{url.path}?{url.query}".encode()
+        ).hexdigest()
+        self.etag = f'"{digest[:32]}"'
+
+        if_none_match = self.request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, self.etag):
+            return Response(status_code=304, headers=self._headers())
+
+        body = await _get_body(self.etag)
+        if body is not None:
+            return self._response(body)
+        return None
+
+    async def respond(self, content: BaseModel) -> Response:
+        """Serialize the response and keep it for the next lookups."""
+        body = content.model_dump_json().encode()
+        if self.etag is not None:
+            await _set_body(self.etag, body)
+        return self._response(body)
+
+    def _headers(self) -> dict[str, str]:
+        headers = {"Cache-Control": "private, no-cache"}
+        if self.etag is not None:
+            headers["ETag"] = self.etag
+        return headers
+
+    def _response(self, body: bytes) -> Response:
+        return Response(body, media_type="application/json", headers=self._headers())
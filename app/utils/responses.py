@@ -0,0 +1,16 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class AppJSONResponse(JSONResponse):
+    """A JSONResponse serialized by pydantic-core, models and all.
+
+    FastAPI passes a returned Response through as is, so wrapping an
+    `AppResponse` in it skips the second validation and encoding against
+    the route's response model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, fallback=str)
@@ -0,0 +1,79 @@
+from uuid import UUID
+
+from app.core.redis import get_redis
+
+UUID_SPACE = 2**128
+
+# keep shard bookkeeping around long enough to inspect and retry a run
+PROGRESS_TTL = 60 * 60 * 24
+CHECKPOINT_TTL = 60 * 60 * 24 * 7
+
+
+def shard_bounds(shard: int, shard_count: int) -> tuple[UUID | None, UUID | None]:
+    """Exclusive (after, before) user id bounds of one slice of the id space.
+
+    The first and last shards are open ended so no id falls outside a shard.
+    """
+    span = UUID_SPACE // shard_count
+    after = UUID(int=shard * span - 1) if shard > 0 else None
+    before = UUID(int=(shard + 1) * span) if shard < shard_count - 1 else None
+    return after, before
+
+
+class ShardProgress:
+    """Per-shard status of one fan-out run, kept in a Redis hash."""
+
+    RUNNING = "running"
+    DONE = "done"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+    def __init__(self, task_name: str, run_id: str) -> None:
+        self.key = f"shards:{task_name}:{run_id}"
+
+    def get(self, shard: int) -> str | None:
+        return get_redis().hget(self.key, str(shard))
+
+    def set(self, shard: int, status: str) -> None:
+        pipeline = get_redis().pipeline()
+        pipeline.hset(self.key, str(shard), status)
+        pipeline.expire(self.key, PROGRESS_TTL)
+        pipeline.execute()
+
+    def all(self) -> dict[int, str]:
+        progress = get_redis().hgetall(self.key)
+        return {int(shard): status for shard, status in progress.items()}
+
+    def failed(self) -> list[int]:
+        return [
+            shard
+            for shard, status in self.all().items()
+            if status.startswith(self.FAILED)
+        ]
+
+
+class ShardCheckpoint:
+    """Last user id a shard fully processed, so a cut-short run can resume."""
+
+    COMPLETE = "complete"
+
+    def __init__(self, scope: str, shard: int, shard_count: int) -> None:
+        self.key = f"checkpoint:{scope}:{shard}/{shard_count}"
+
+    def get(self) -> UUID | None:
+        user_id = get_redis().get(self.key)
+        if not user_id or user_id == self.COMPLETE:
+            return None
+        return UUID(user_id)
+
+    def is_complete(self) -> bool:
+        return get_redis().get(self.key) == self.COMPLETE
+
+    def complete(self) -> None:
+        get_redis().set(self.key, self.COMPLETE, ex=CHECKPOINT_TTL)
+
+    def set(self, user_id: UUID) -> None:
+        get_redis().set(self.key, str(user_id), ex=CHECKPOINT_TTL)
+
+    def clear(self) -> None:
+        get_redis().delete(self.key)
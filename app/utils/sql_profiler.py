@@ -0,0 +1,146 @@
+import logging
+import re
+import sys
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import FrameType
+
+from greenlet import getcurrent
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# modules between the code that queried and the cursor
+_PLUMBING = ("app.core.database", "app.utils.sql_profiler", "app.middleware")
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBERED_PARAM = re.compile(r"\$\d+")
+# expanded IN lists and multi-row VALUES, whatever their length
+_PARAM_LIST = re.compile(r"\(\?(?:, \?)*\)(?:, \(\?(?:, \?)*\))*")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement without layout, parameter numbering or list lengths."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _NUMBERED_PARAM.sub("?", shape.replace("%s", "?"))
+    return _PARAM_LIST.sub("(?)", shape)
+
+
+def _frames() -> list[FrameType]:
+    """The calling frames, innermost first, across SQLAlchemy's greenlets.
+
+    Async sessions run the sync engine in a child greenlet, so the code that
+    awaited the session is only reachable from the parent greenlet's frame.
+    """
+    frames = []
+    frame: FrameType | None = sys._getframe(1)
+    current = getcurrent()
+    while current is not None:
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        current = current.parent
+        frame = current.gr_frame if current is not None else None
+    return frames
+
+
+def find_origin() -> str:
+    """The outermost CRUD function on the stack, else the innermost app code."""
+    crud = app_code = None
+    for frame in _frames():
+        module = frame.f_globals.get("__name__", "")
+        name = f"{module}.{frame.f_code.co_qualname}"
+        if module.startswith("app.crud."):
+            crud = name
+        elif app_code is None and module.startswith("app."):
+            if module not in _PLUMBING:
+                app_code = name
+    return crud or app_code or "unknown"
+
+
+@dataclass
+class Query:
+    shape: str
+    seconds: float
+    origin: str
+
+
+class QueryProfile:
+    """The SQL statements run while this profile is `current_profile`."""
+
+    def __init__(self) -> None:
+        self.queries: list[Query] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries.append(Query(statement_shape(statement), seconds, find_origin()))
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(query.seconds for query in self.queries)
+
+    def repeated(self) -> list[tuple[str, str, int]]:
+        """(origin, shape, count) of the SELECTs that look like an N+1."""
+        counts = Counter(
+            (query.origin, query.shape)
+            for query in self.queries
+            if query.shape[:6].upper() == "SELECT"
+        )
+        return [
+            (origin, shape, count)
+            for (origin, shape), count in counts.items()
+            if count >= settings.SQL_PROFILER_REPEAT_THRESHOLD
+        ]
+
+    def server_timing(self) -> str:
+        """A `Server-Timing` header value: the total, each origin, each N+1."""
+        by_origin: defaultdict[str, list[Query]] = defaultdict(list)
+        for query in self.queries:
+            by_origin[query.origin].append(query)
+
+        entries = [_timing("db", self.total_seconds, f"{len(self.queries)} queries")]
+        for index, (origin, queries) in enumerate(by_origin.items(), 1):
+            seconds = sum(query.seconds for query in queries)
+            entries.append(_timing(f"db-{index}", seconds, f"{origin} x{len(queries)}"))
+        for index, (origin, shape, count) in enumerate(self.repeated(), 1):
+            entries.append(
+                _timing(f"n-plus-one-{index}", None, f"{origin} x{count}: {shape}")
+            )
+        return ", ".join(entries)
+
+    def log(self, label: str) -> None:
+        if not self.queries:
+            return
+
+        logger.info(
+            "SQL profile of %s: %d queries in %.1fms\n%s",
+            label,
+            len(self.queries),
+            self.total_seconds * 1000,
+            "\n".join(
+                f"  {query.seconds * 1000:8.2f}ms {query.origin}: {query.shape}"
+                for query in self.queries
+            ),
+        )
+        for origin, shape, count in self.repeated():
+            logger.warning(
+                "Possible N+1 in %s: %s ran %d times: %s", label, origin, count, shape
+            )
+
+
+def _timing(name: str, seconds: float | None, description: str) -> str:
+    # a quoted-string that stays short and latin-1 encodable
+    if len(description) > 120:
+        description = description[:117] + "..."
+    description = description.encode("latin-1", "replace").decode("latin-1")
+    description = description.replace("\\", "\\\\").replace('"', '\\"')
+    if seconds is None:
+        return f'{name};desc="{description}"'
+    return f'{name};dur={seconds * 1000:.2f};desc="{description}"'
+
+
+# the profile collecting the statements of the current request or task
+current_profile: ContextVar[QueryProfile | None] = ContextVar(
+    "current_profile", default=None
+)
@@ -1,7 +1,9 @@
 import re
-import unidecode
 
 
 def slugify(text):
+    # imported on first use, to keep it off the import path
+    import unidecode
+
     text = unidecode.unidecode(text).lower()
     return re.sub(r"[\W_]+", "_", text)
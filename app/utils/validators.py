@@ -1,9 +1,10 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import re
 
 from pydantic_core import PydanticCustomError
 
 from app.utils import date_tz
+from app.utils.cursor import decode_cursor
 
 length_regex = r"^.{8,}$"  # At least 8 characters
 uppercase_regex = r"(?=.*[A-Z])"  # At least one uppercase letter
@@ -64,9 +65,36 @@ def validate_goal_deadline(deadline: datetime):
     return deadline
 
 
+def validate_utc(value: datetime | None):
+    # a datetime without an offset is taken as UTC, like the stored timestamps
+    if value is None:
+        return value
+    elif value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+
+    return value.astimezone(timezone.utc)
+
+
 def validate_exercise(exercise: str):
     if not re.match(only_char_regex, exercise):
         raise PydanticCustomError(
             "exercise_error",
             "Exercise must be valid string with alphabets, '_'.",
         )
+
+    return exercise
+
+
+def validate_cursor(cursor: str | None):
+    if cursor is None:
+        return cursor
+
+    try:
+        decode_cursor(cursor)
+    except ValueError:
+        raise PydanticCustomError(
+            "cursor_error",
+            "Cursor is invalid or has expired.",
+        )
+
+    return cursor
@@ -0,0 +1,24 @@
+"""Rebuild the ``workout_daily_rollup`` table from the workouts.
+
+The rollups are kept in step by the workout CRUD functions. Run this once
+after the migration that adds the table, and after any bulk edits made
+outside the API.
+
+Usage:
+    poetry run python -m scripts.backfill_workout_rollups
+"""
+
+import anyio
+
+from app.core.database import aget_db
+from app.crud import workout_rollups as rollup_crud
+
+
+async def main() -> None:
+    async for session in aget_db():
+        count = await rollup_crud.rebuild_workout_rollups(session)
+        print(f"Rebuilt {count} daily rollups")
+
+
+if __name__ == "__main__":
+    anyio.run(main)
@@ -0,0 +1,266 @@
+"""Load test every route of the API with a concurrent async client.
+
+Logs in as users created by ``scripts.seed_benchmark_data``, then sends
+``--requests`` requests to each route of ``api_router`` from
+``--concurrency`` concurrent workers. For each route it reports the status
+codes, p50/p95/p99 latency and throughput. Routes that delete run last,
+and only while there are seeded goals or workouts left to delete.
+
+By default the app is served in-process over ASGI. Pass ``--url`` to load
+test a running server instead, e.g. ``--url http://localhost:8000``.
+
+Usage:
+    poetry run python -m scripts.benchmark_api [--url URL] [--users N]
+        [--requests N] [--concurrency N] [--route NAME ...]
+"""
+
+import argparse
+import itertools
+import random
+import statistics
+import time
+from collections import Counter
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable
+from uuid import uuid4
+
+import anyio
+import httpx
+from fastapi.routing import APIRoute
+
+from app.api.main import api_router
+from app.core.config import settings
+from app.utils import date_tz
+from scripts.seed_benchmark_data import (
+    BENCHMARK_PASSWORD,
+    EXERCISES,
+    benchmark_email,
+)
+
+
+@dataclass
+class BenchmarkUser:
+    email: str
+    headers: dict[str, str]
+    refresh_token: str
+    goal_ids: list[str] = field(default_factory=list)
+    workout_ids: list[str] = field(default_factory=list)
+
+
+# request arguments for a route, or None once there is nothing left to send
+Scenario = Callable[[BenchmarkUser], dict[str, Any] | None]
+
+
+def new_workout() -> dict[str, Any]:
+    return {
+        "exercise": random.choice(EXERCISES),
+        "duration": random.randint(10, 120),
+        "calories_burned": float(random.randint(100, 400)),
+    }
+
+
+def by_id(
+    path: str, ids: list[str], consume: bool = False, **kwargs: Any
+) -> dict[str, Any] | None:
+    if not ids:
+        return None
+    target = ids.pop() if consume else random.choice(ids)
+    return {"url": path.format(target), **kwargs}
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "user_signup": lambda user: {
+        "url": "/auth/signup",
+        "json": {
+            "first_name": "Bench",
+            "last_name": "Signup",
+            "email": f"signup-{uuid4().hex}@example.com",
+            "password": BENCHMARK_PASSWORD,
+        },
+        "headers": {},
+    },
+    "user_login": lambda user: {
+        "url": "/auth/login",
+        "data": {"username": user.email, "password": BENCHMARK_PASSWORD},
+        "headers": {},
+    },
+    "refresh_token": lambda user: {
+        "url": "/auth/refresh",
+        "json": {"refresh": user.refresh_token},
+    },
+    "get_all_goals": lambda user: {"url": "/goals/", "params": {"limit": 20}},
+    "create_goal": lambda user: {
+        "url": "/goals/",
+        "json": {
+            "target_exercise": random.choice(EXERCISES),
+            "target_duration": 30,
+            "target_calories": 500,
+            "deadline": (date_tz.now() + timedelta(days=30)).isoformat(),
+        },
+    },
+    "update_goal": lambda user: by_id(
+        "/goals/{}", user.goal_ids, json={"target_duration": random.randint(10, 120)}
+    ),
+    "delete_goal": lambda user: by_id("/goals/{}", user.goal_ids, consume=True),
+    "get_all_workouts": lambda user: {"url": "/workouts/", "params": {"limit": 20}},
+    "get_workout_stats": lambda user: {
+        "url": "/workouts/stats",
+        "params": {"period": "week"},
+    },
+    "export_workouts": lambda user: {
+        "url": "/workouts/export",
+        "params": {"format": "csv"},
+    },
+    "get_workout": lambda user: by_id("/workouts/{}", user.workout_ids),
+    "create_workout": lambda user: {"url": "/workouts/", "json": new_workout()},
+    "create_workouts_bulk": lambda user: {
+        "url": "/workouts/bulk",
+        "json": [new_workout() for _ in range(100)],
+    },
+    "update_workout": lambda user: by_id(
+        "/workouts/{}", user.workout_ids, json={"duration": random.randint(10, 120)}
+    ),
+    "delete_workout": lambda user: by_id(
+        "/workouts/{}", user.workout_ids, consume=True
+    ),
+    "health_check": lambda user: {"url": "/utils/health-check", "headers": {}},
+    "get_metrics": lambda user: {
+        "url": "/utils/metrics",
+        "auth": (settings.SWAGGER_USERNAME, settings.SWAGGER_PASSWORD),
+        "headers": {},
+    },
+}
+
+
+@dataclass
+class Result:
+    statuses: Counter[int] = field(default_factory=Counter)
+    latencies: list[float] = field(default_factory=list)
+    elapsed: float = 0
+
+
+async def log_in(client: httpx.AsyncClient, email: str) -> BenchmarkUser:
+    response = await client.post(
+        "/auth/login", data={"username": email, "password": BENCHMARK_PASSWORD}
+    )
+    response.raise_for_status()
+    tokens = response.json()
+    user = BenchmarkUser(
+        email=email,
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        refresh_token=tokens["refresh_token"],
+    )
+
+    for path, ids in (("/goals/", user.goal_ids), ("/workouts/", user.workout_ids)):
+        response = await client.get(path, headers=user.headers, params={"limit": 100})
+        response.raise_for_status()
+        ids.extend(item["id"] for item in response.json()["result"])
+    return user
+
+
+async def run_route(
+    client: httpx.AsyncClient,
+    route: APIRoute,
+    method: str,
+    users: list[BenchmarkUser],
+    requests: int,
+    concurrency: int,
+) -> Result:
+    scenario = SCENARIOS[route.name]
+    result = Result()
+    counter = itertools.count()
+
+    async def worker() -> None:
+        while (index := next(counter)) < requests:
+            user = users[index % len(users)]
+            kwargs = scenario(user)
+            if kwargs is None:
+                return
+            kwargs["headers"] = kwargs.get("headers", user.headers)
+
+            start = time.perf_counter()
+            response = await client.request(method, **kwargs)
+            result.latencies.append(time.perf_counter() - start)
+            result.statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    async with anyio.create_task_group() as tg:
+        for _ in range(concurrency):
+            tg.start_soon(worker)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def report(name: str, result: Result) -> None:
+    latencies = result.latencies
+    if len(latencies) < 2:
+        print(f"{name:<44} skipped, nothing to send")
+        return
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    statuses = ",".join(
+        f"{code}x{count}" for code, count in sorted(result.statuses.items())
+    )
+    print(
+        f"{name:<44} {len(latencies):>6} {cuts[49] * 1000:>8.1f} "
+        f"{cuts[94] * 1000:>8.1f} {cuts[98] * 1000:>8.1f} "
+        f"{len(latencies) / result.elapsed:>9.1f}  {statuses}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    routes = [
+        (route, method)
+        for route in api_router.routes
+        if isinstance(route, APIRoute)
+        for method in sorted(route.methods)
+        if not args.route or route.name in args.route
+    ]
+    missing = sorted({route.name for route, _ in routes} - SCENARIOS.keys())
+    if missing:
+        raise SystemExit(f"No benchmark scenario for: {', '.join(missing)}")
+
+    # deletes go last, workouts before the goals that hold them
+    deletes = [(route, method) for route, method in routes if method == "DELETE"]
+    routes = [entry for entry in routes if entry not in deletes] + deletes[::-1]
+
+    async with AsyncExitStack() as stack:
+        if args.url:
+            transport = None
+            base_url = args.url.rstrip("/") + settings.API_V1_STR
+        else:
+            from app.main import app
+
+            # ASGITransport doesn't send lifespan events itself
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            base_url = f"http://benchmark{settings.API_V1_STR}"
+
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60)
+        )
+        users = [
+            await log_in(client, benchmark_email(index)) for index in range(args.users)
+        ]
+
+        print(
+            f"{'route':<44} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'req/s':>9}  statuses"
+        )
+        for route, method in routes:
+            result = await run_route(
+                client, route, method, users, args.requests, args.concurrency
+            )
+            report(f"{method} {route.path}", result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", help="base URL of a running server")
+    parser.add_argument("--users", type=int, default=20, help="seeded users")
+    parser.add_argument("--requests", type=int, default=200, help="per route")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--route", nargs="*", help="only these route names")
+    anyio.run(main, parser.parse_args())
@@ -0,0 +1,102 @@
+"""Compare the CPU cost of serializing a 100-item workout page.
+
+Times FastAPI's response model path, which re-validates and re-encodes
+what the route returns, against returning an ``AppJSONResponse`` that
+pydantic-core serializes straight from the ORM objects. No database or
+server is involved.
+
+Usage:
+    poetry run python -m scripts.benchmark_response_serialization [iterations]
+"""
+
+import sys
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+import anyio
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models.goals import Goal
+from app.models.workouts import Workout
+from app.schemas.base import AppPaginatedResponse
+from app.schemas.workouts import WorkoutPublic
+from app.utils import date_tz
+from app.utils.responses import AppJSONResponse
+
+PAGE_SIZE = 100
+
+ResponseType = AppPaginatedResponse[WorkoutPublic]
+
+
+def make_page() -> list[Workout]:
+    now = date_tz.now()
+    goal = Goal(
+        id=uuid4(),
+        target_exercise="running",
+        target_duration=30,
+        target_calories=500,
+        deadline=now + timedelta(days=30),
+    )
+    return [
+        Workout(
+            id=uuid4(),
+            exercise="running",
+            duration=30,
+            calories_burned=120.5,
+            goal=goal,
+            created_at=now,
+        )
+        for _ in range(PAGE_SIZE)
+    ]
+
+
+async def response_model_path(workouts: list[Workout]) -> bytes:
+    content = ResponseType(
+        result=[WorkoutPublic.model_validate(workout) for workout in workouts],
+        page=1,
+        limit=PAGE_SIZE,
+        status=200,
+    )
+    field = create_model_field(
+        name="Response", type_=ResponseType, mode="serialization"
+    )
+    encoded = await serialize_response(field=field, response_content=content)
+    return JSONResponse(encoded).body
+
+
+async def direct_path(workouts: list[Workout]) -> bytes:
+    content = ResponseType(result=workouts, page=1, limit=PAGE_SIZE, status=200)
+    return AppJSONResponse(content).body
+
+
+async def measure(
+    serialize: Callable[[list[Workout]], Awaitable[bytes]],
+    workouts: list[Workout],
+    iterations: int,
+) -> float:
+    """Mean CPU seconds per call."""
+    await serialize(workouts)
+    start = time.process_time()
+    for _ in range(iterations):
+        await serialize(workouts)
+    return (time.process_time() - start) / iterations
+
+
+async def main(iterations: int) -> None:
+    workouts = make_page()
+    assert await response_model_path(workouts) == await direct_path(workouts)
+
+    before = await measure(response_model_path, workouts, iterations)
+    after = await measure(direct_path, workouts, iterations)
+    print(f"{PAGE_SIZE}-item page, {iterations} iterations")
+    print(f"response model path: {before * 1e6:8.1f} µs/request")
+    print(f"AppJSONResponse:     {after * 1e6:8.1f} µs/request")
+    print(f"saved:               {(before - after) * 1e6:8.1f} µs/request")
+
+
+if __name__ == "__main__":
+    anyio.run(main, int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,95 @@
+"""Time a cold start of the API, as a freshly scheduled pod would see it.
+
+Each run starts a new interpreter that imports ``app.main``, builds an app
+with ``create_app``, runs its lifespan startup and serves a first health
+check over ASGI. The script reports the median of each phase over
+``--runs`` runs. It also lists the modules from ``LAZY_MODULES`` that were
+imported anyway, since only the workers or rare code paths need them.
+
+Usage:
+    poetry run python -m scripts.benchmark_startup [--runs N]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# kept off the API's import path
+LAZY_MODULES = ("celery", "app.tasks", "smtplib", "unidecode")
+
+PHASES = ("import", "create_app", "startup", "first_request", "total")
+
+
+def cold_start() -> None:
+    """One run, in a fresh interpreter, printing its timings as JSON."""
+    timings = {}
+    start = time.perf_counter()
+
+    import app.main
+
+    timings["import"] = time.perf_counter() - start
+
+    started_at = time.perf_counter()
+    fastapi_app = app.main.create_app()
+    timings["create_app"] = time.perf_counter() - started_at
+
+    import anyio
+    import httpx
+
+    from app.core.config import settings
+
+    async def serve() -> None:
+        started_at = time.perf_counter()
+        async with fastapi_app.router.lifespan_context(fastapi_app):
+            timings["startup"] = time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            transport = httpx.ASGITransport(app=fastapi_app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark"
+            ) as client:
+                response = await client.get(f"{settings.API_V1_STR}/utils/health-check")
+                response.raise_for_status()
+            timings["first_request"] = time.perf_counter() - started_at
+
+    anyio.run(serve)
+    loaded = [name for name in LAZY_MODULES if name in sys.modules]
+    print(json.dumps({"timings": timings, "loaded": loaded}))
+
+
+def main(args: argparse.Namespace) -> None:
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "scripts.benchmark_startup", "--child"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        run = json.loads(output.splitlines()[-1])
+        # interpreter start-up and exit included
+        run["timings"]["total"] = time.perf_counter() - start
+        runs.append(run)
+
+    print(f"{args.runs} cold starts, median")
+    for phase in PHASES:
+        median = statistics.median(run["timings"][phase] for run in runs)
+        print(f"{phase:<14} {median * 1000:8.1f} ms")
+
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    print(f"lazy modules loaded: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        cold_start()
+    else:
+        main(args)
@@ -0,0 +1,71 @@
+"""Time the notifier tasks end to end against the in-memory mailer.
+
+Runs ``anotify_user_fitness_goal_achieved`` and
+``anotify_user_weekly_fitness_resport`` over the whole configured database,
+e.g. one filled by ``scripts.seed_benchmark_data``, with emails collected
+in memory instead of sent. Goals are marked unnotified first so runs are
+repeatable; pass ``--keep-notified`` to time a run with nothing to send.
+
+Usage:
+    poetry run python -m scripts.benchmark_tasks [--task goals|weekly]
+        [--keep-notified]
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+import anyio
+from sqlalchemy.sql import update
+
+from app.core.config import settings
+from app.core.database import aget_db
+from app.models.goals import Goal
+from app.tasks import (
+    anotify_user_fitness_goal_achieved,
+    anotify_user_weekly_fitness_resport,
+)
+from app.utils import date_tz, email_service
+
+
+async def reset_notified() -> None:
+    async for session in aget_db():
+        await session.execute(update(Goal).values(is_notified=False))
+        await session.commit()
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings.EMAIL_BACKEND = "memory"
+    if not args.keep_notified:
+        await reset_notified()
+
+    end_date = date_tz.now()
+    jobs = {
+        "goals": (anotify_user_fitness_goal_achieved,),
+        "weekly": (
+            anotify_user_weekly_fitness_resport,
+            end_date - timedelta(weeks=1),
+            end_date,
+        ),
+    }
+    for name, (job, *job_args) in jobs.items():
+        if args.task and name not in args.task:
+            continue
+
+        email_service.outbox.clear()
+        start = time.perf_counter()
+        await job(*job_args)
+        elapsed = time.perf_counter() - start
+        sent = len(email_service.outbox)
+        print(
+            f"{job.__name__}: {sent:,} emails in {elapsed:.2f}s "
+            f"({sent / elapsed:,.0f}/s)"
+        )
+    email_service.outbox.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--task", nargs="*", choices=["goals", "weekly"])
+    parser.add_argument("--keep-notified", action="store_true")
+    anyio.run(main, parser.parse_args())
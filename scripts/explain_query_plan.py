@@ -0,0 +1,137 @@
+"""Print the SQLite query plan of every read query issued by the CRUD layer.
+
+Seeds a throwaway database, runs each CRUD read function once while
+recording the statements it emits, then replays them through
+``EXPLAIN QUERY PLAN``. Any full table scan is flagged.
+
+Usage:
+    poetry run python -m scripts.explain_query_plan
+"""
+
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+import anyio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.crud import goals as goal_crud
+from app.crud import users as user_crud
+from app.crud import workout_rollups as rollup_crud
+from app.crud import workouts as workout_crud
+from app.models.base import Base
+from app.models.goals import Goal
+from app.models.users import User
+from app.models.workouts import Workout
+from app.utils import date_tz
+
+
+async def seed(session: AsyncSession) -> tuple[User, Goal, Workout]:
+    user = User(first_name="Plan", last_name="Probe", email="plan@example.com")
+    user.password = "unused"
+    goal = Goal(
+        target_exercise="running",
+        target_duration=30,
+        target_calories=500,
+        deadline=date_tz.now() + timedelta(days=30),
+        user=user,
+    )
+    workouts = [
+        Workout(
+            exercise="running",
+            duration=30,
+            calories_burned=100,
+            user=user,
+            goal=goal,
+        )
+        for _ in range(20)
+    ]
+    session.add_all([user, goal, *workouts])
+    await session.commit()
+    return user, goal, workouts[0]
+
+
+async def probe(session: AsyncSession, user: User, goal: Goal, workout: Workout):
+    now = date_tz.now()
+    page = await workout_crud.get_all_workouts(session, user, 1, 10, "")
+    yield "workouts.get_all_workouts (offset)"
+    await workout_crud.get_all_workouts(session, user, 1, 10, "", page.next_cursor)
+    yield "workouts.get_all_workouts (cursor)"
+    await workout_crud.get_all_workouts(session, user, 1, 10, "running")
+    yield "workouts.get_all_workouts (exercise)"
+    await workout_crud.get_workout(session, user, workout.id)
+    yield "workouts.get_workout"
+    workouts = workout_crud.stream_weekly_fitness_trend(
+        session, [user.id], now - timedelta(days=7), now
+    )
+    async for _ in workouts:
+        pass
+    yield "workouts.stream_weekly_fitness_trend"
+    async for _ in workout_crud.stream_workouts(session, user, "", now, now):
+        pass
+    yield "workouts.stream_workouts"
+    await rollup_crud.get_workout_stats(session, user, "week", "", now.date())
+    yield "workout_rollups.get_workout_stats"
+    await goal_crud.get_all_paginated_goals(session, user, 1, 10)
+    yield "goals.get_all_paginated_goals"
+    await goal_crud.get_goal_by_id(session, user, goal.id)
+    yield "goals.get_goal_by_id"
+    await goal_crud.get_achieved_goals_batch(session, None, 500)
+    yield "goals.get_achieved_goals_batch"
+    await user_crud.get_all_user(session)
+    yield "users.get_all_user"
+    await user_crud.get_active_users_batch(session, None, 500)
+    yield "users.get_active_users_batch"
+    await user_crud.get_user_by_email(session, user.email)
+    yield "users.get_user_by_email"
+
+
+async def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'plan.db'}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            user, goal, workout = await seed(session)
+
+            captured: list[tuple[str, tuple]] = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    captured.append((statement, parameters))
+
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            queries: list[tuple[str, str, tuple]] = []
+            async for label in probe(session, user, goal, workout):
+                queries.extend((label, stmt, params) for stmt, params in captured)
+                captured.clear()
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+            full_scans = 0
+            for label, statement, parameters in queries:
+                conn = await session.connection()
+                raw = await conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+                plan = [row[3] for row in raw.all()]
+                scans = [
+                    step
+                    for step in plan
+                    if step.startswith("SCAN") and "INDEX" not in step
+                ]
+                full_scans += len(scans)
+                print(f"{'FULL SCAN' if scans else 'ok':>9}  {label}")
+                for step in plan:
+                    print(f"{'':>11}{step}")
+
+        await engine.dispose()
+
+    print(f"\n{len(queries)} statements, {full_scans} full table scans")
+    return 1 if full_scans else 0
+
+
+if __name__ == "__main__":
+    sys.exit(anyio.run(main))
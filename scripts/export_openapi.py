@@ -0,0 +1,31 @@
+"""Write the API's OpenAPI schema to a file, e.g. when building the image.
+
+Point ``OPENAPI_SCHEMA_FILE`` at the file and ``/openapi.json`` serves it
+instead of generating the schema in every worker. The file records a
+fingerprint of the app's source and libraries, and is ignored by any other
+build, so export again whenever the code changes.
+
+Usage:
+    poetry run python -m scripts.export_openapi [path]
+"""
+
+import sys
+from pathlib import Path
+
+from pydantic_core import to_json
+
+from app.core.config import settings
+from app.main import app
+from app.utils.openapi import build_openapi
+
+
+def main(path: str) -> None:
+    Path(path).write_bytes(to_json(build_openapi(app)))
+    print(f"OpenAPI schema written to {path}")
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else settings.OPENAPI_SCHEMA_FILE
+    if not path:
+        raise SystemExit("Pass a path or set OPENAPI_SCHEMA_FILE")
+    main(path)
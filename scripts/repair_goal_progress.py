@@ -0,0 +1,22 @@
+"""Recompute every goal's calories and duration progress from its workouts.
+
+The counters on ``goal`` are kept in step by the workout CRUD functions.
+Run this after bulk edits made outside the API, or whenever they drift.
+
+Usage:
+    poetry run python -m scripts.repair_goal_progress
+"""
+
+import anyio
+
+from app.core.database import aget_db
+from app.crud import goals as goal_crud
+
+
+async def main() -> None:
+    async for session in aget_db():
+        await goal_crud.recompute_goal_progress(session)
+
+
+if __name__ == "__main__":
+    anyio.run(main)
@@ -0,0 +1,140 @@
+"""Fill the configured database with synthetic users, goals and workouts.
+
+Every user gets ``--goals`` goals with ``--workouts`` workouts each, spread
+over the last ``--days`` days, so ``--users 100000 --goals 5 --workouts 20``
+writes about 10M rows. Goal progress counters and the daily rollups are
+filled in to match. Rows are inserted in batches of ``--batch-size``.
+
+All users share the password ``BENCHMARK_PASSWORD`` and are named
+``bench<n>@example.com``. Seed a fresh, migrated database
+(``alembic upgrade head``), SQLite or PostgreSQL as set by ``SQLITE_DB`` or
+``DATABASE_URL``.
+
+Usage:
+    poetry run python -m scripts.seed_benchmark_data [--users N] [--goals N]
+        [--workouts N] [--days N] [--batch-size N] [--seed N]
+"""
+
+import argparse
+import random
+import time
+from datetime import timedelta
+from typing import Any, Iterator
+from uuid import uuid4
+
+import anyio
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import insert
+
+from app.core.database import aget_db
+from app.core.security import get_password_hash
+from app.crud import workout_rollups as rollup_crud
+from app.models.goals import Goal
+from app.models.users import User
+from app.models.workouts import Workout
+from app.utils import date_tz
+
+BENCHMARK_PASSWORD = "Benchmark1!"
+
+EXERCISES = ("running", "cycling", "swimming", "rowing", "walking")
+
+
+def benchmark_email(index: int) -> str:
+    return f"bench{index}@example.com"
+
+
+def generate_rows(
+    args: argparse.Namespace, password: str, first: int, count: int
+) -> Iterator[tuple[type[Any], dict[str, Any]]]:
+    """Rows of users ``first`` to ``first + count``, parents first."""
+    rng = random.Random(args.seed + first)
+    now = date_tz.now()
+    for index in range(first, first + count):
+        user_id = uuid4()
+        yield User, {
+            "id": user_id,
+            "first_name": "Bench",
+            "last_name": f"User{index}",
+            "email": benchmark_email(index),
+            "password": password,
+            "created_at": now - timedelta(days=args.days),
+        }
+
+        for _ in range(args.goals):
+            goal_id = uuid4()
+            exercise = rng.choice(EXERCISES)
+            workouts = [
+                {
+                    "id": uuid4(),
+                    "exercise": exercise,
+                    "duration": rng.randint(10, 120),
+                    "calories_burned": float(rng.randint(100, 400)),
+                    "user_id": user_id,
+                    "goal_id": goal_id,
+                    "created_at": now
+                    - timedelta(seconds=rng.randint(0, args.days * 86400)),
+                }
+                for _ in range(args.workouts)
+            ]
+            yield Goal, {
+                "id": goal_id,
+                "target_exercise": exercise,
+                "target_duration": rng.randint(10, 120),
+                "target_calories": float(rng.randint(100, 1000)),
+                "deadline": now + timedelta(days=rng.randint(1, 90)),
+                "calories_progress": sum(w["calories_burned"] for w in workouts),
+                "duration_progress": sum(w["duration"] for w in workouts),
+                "user_id": user_id,
+                "created_at": now - timedelta(days=args.days),
+            }
+            for workout in workouts:
+                yield Workout, workout
+
+
+async def insert_rows(
+    session: AsyncSession, rows: Iterator[tuple[type[Any], dict[str, Any]]]
+) -> int:
+    batches: dict[type[Any], list[dict[str, Any]]] = {User: [], Goal: [], Workout: []}
+    count = 0
+    for model, row in rows:
+        batches[model].append(row)
+        count += 1
+
+    # parents before children, for the foreign keys
+    for model, batch in batches.items():
+        if batch:
+            await session.execute(insert(model), batch)
+    await session.commit()
+    return count
+
+
+async def main(args: argparse.Namespace) -> None:
+    password = await get_password_hash(BENCHMARK_PASSWORD)
+    rows_per_user = 1 + args.goals + args.goals * args.workouts
+    users_per_batch = max(1, args.batch_size // rows_per_user)
+
+    start = time.perf_counter()
+    async for session in aget_db():
+        count = 0
+        for first in range(0, args.users, users_per_batch):
+            users = min(users_per_batch, args.users - first)
+            count += await insert_rows(
+                session, generate_rows(args, password, first, users)
+            )
+            print(f"\r{count:,} rows", end="", flush=True)
+
+        rollups = await rollup_crud.rebuild_workout_rollups(session)
+        print(f"\r{count:,} rows and {rollups:,} daily rollups", end="")
+
+    print(f" in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--goals", type=int, default=3, help="per user")
+    parser.add_argument("--workouts", type=int, default=10, help="per goal")
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    anyio.run(main, parser.parse_args())
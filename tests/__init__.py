@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# the settings the app requires, for a run without a .env
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("PROJECT_NAME", "fitness-tracker-test")
+os.environ.setdefault("SQLITE_DB", os.path.join(tempfile.mkdtemp(), "test"))
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("SWAGGER_USERNAME", "test")
+os.environ.setdefault("SWAGGER_PASSWORD", "test")
+os.environ.setdefault("FIRST_SUPERUSER", "admin@example.com")
+os.environ.setdefault("FIRST_SUPERUSER_PASSWORD", "Password1!")
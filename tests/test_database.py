@@ -0,0 +1,62 @@
+import time
+import unittest
+from typing import cast
+from unittest import mock
+
+import anyio
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.database import ReplicaRouter
+
+
+class ReplicaRouterTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.engines = [cast(AsyncEngine, object()) for _ in range(3)]
+        self.down = {self.engines[1]}
+        self.checks = 0
+
+        async def is_healthy(engine: AsyncEngine) -> bool:
+            self.checks += 1
+            # a dead replica only answers at the timeout
+            await anyio.sleep(0.2 if engine in self.down else 0)
+            return engine not in self.down
+
+        patcher = mock.patch.object(
+            ReplicaRouter, "_is_healthy", side_effect=is_healthy
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_replicas_are_checked_concurrently(self) -> None:
+        self.down = set(self.engines)
+        router = ReplicaRouter(self.engines, interval=60)
+
+        start = time.perf_counter()
+        self.assertIsNone(await router.get_engine())
+        self.assertLess(time.perf_counter() - start, 0.4)
+        self.assertEqual(self.checks, 3)
+
+    async def test_concurrent_requests_share_one_check(self) -> None:
+        router = ReplicaRouter(self.engines, interval=60)
+        async with anyio.create_task_group() as tg:
+            for _ in range(5):
+                tg.start_soon(router.get_engine)
+
+        self.assertEqual(self.checks, 3)
+        self.assertEqual(
+            {await router.get_engine() for _ in range(4)},
+            {self.engines[0], self.engines[2]},
+        )
+
+    async def test_requests_do_not_wait_on_background_checks(self) -> None:
+        router = ReplicaRouter(self.engines, interval=0.05)
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(router.keep_checked)
+            await anyio.sleep(0.3)
+
+            start = time.perf_counter()
+            self.assertIsNotNone(await router.get_engine())
+            self.assertLess(time.perf_counter() - start, 0.05)
+            tg.cancel_scope.cancel()
+
+        self.assertGreater(self.checks, 3)
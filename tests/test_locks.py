@@ -0,0 +1,44 @@
+import time
+import unittest
+from unittest import mock
+
+from redis.exceptions import RedisError
+
+from app.utils.locks import LeaseLock
+
+
+class LeaseLockTest(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch("app.utils.locks.Lock")
+        self.addCleanup(patcher.stop)
+        self.redis_lock = patcher.start().return_value
+        self.redis_lock.acquire.return_value = True
+
+    def test_renewal_survives_a_redis_error(self) -> None:
+        errors = [RedisError("timeout")]
+
+        def reacquire() -> None:
+            if errors:
+                raise errors.pop()
+
+        self.redis_lock.reacquire.side_effect = reacquire
+        lock = LeaseLock("lock:test", ttl=0.3)
+        self.assertTrue(lock.acquire())
+
+        time.sleep(0.45)
+        self.assertTrue(lock._heartbeat and lock._heartbeat.is_alive())
+        self.assertGreaterEqual(self.redis_lock.reacquire.call_count, 3)
+
+        lock.release()
+        self.redis_lock.release.assert_called_once()
+
+    def test_lease_is_lost_after_ttl_without_renewal(self) -> None:
+        self.redis_lock.reacquire.side_effect = RedisError("down")
+        lock = LeaseLock("lock:test", ttl=0.3)
+        with self.assertLogs("app.utils.locks", "WARNING"):
+            self.assertTrue(lock.acquire())
+            assert lock._heartbeat is not None
+            lock._heartbeat.join(1)
+
+        self.assertFalse(lock._heartbeat.is_alive())
+        lock.release()
@@ -0,0 +1,86 @@
+import unittest
+from collections import defaultdict
+from typing import cast
+
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+
+from app.utils import metrics
+
+
+class FakeRedis:
+    """Hashes behind an async pipeline that can be made to fail."""
+
+    def __init__(self) -> None:
+        self.hashes: defaultdict[str, dict[str, float]] = defaultdict(dict)
+        self.down = False
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list[tuple] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    def hincrbyfloat(self, name: str, key: str, amount: float) -> None:
+        self.commands.append(("hincrbyfloat", name, key, amount))
+
+    def hgetall(self, name: str) -> None:
+        self.commands.append(("hgetall", name))
+
+    async def execute(self) -> list:
+        if self.redis.down:
+            raise RedisError("down")
+        results = []
+        for command, name, *args in self.commands:
+            hash = self.redis.hashes[name]
+            if command == "hincrbyfloat":
+                key, amount = args
+                hash[key] = hash.get(key, 0) + amount
+                results.append(hash[key])
+            else:
+                results.append({key: str(value) for key, value in hash.items()})
+        return results
+
+
+class SharedMetricsTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        self.client = cast(AsyncRedis, self.redis)
+        self.counter = metrics.Counter("test_events_total", "Test events.", ["kind"])
+        self.addCleanup(metrics.REGISTRY.remove, self.counter)
+
+    async def scrape(self) -> str:
+        shared = await metrics.get_shared_values(self.client)
+        samples = metrics.render(shared).splitlines()
+        return next(line for line in samples if line.startswith("test_events_total{"))
+
+    async def test_every_process_renders_the_pushed_totals(self) -> None:
+        self.counter.inc(2, kind="a")
+        await metrics.apush_metrics(self.client)
+        self.assertEqual(await self.scrape(), 'test_events_total{kind="a"} 2')
+
+        # counted but not pushed yet, as in another process answering a scrape
+        self.counter.inc(kind="a")
+        self.assertEqual(await self.scrape(), 'test_events_total{kind="a"} 2')
+
+        await metrics.apush_metrics(self.client)
+        self.assertEqual(await self.scrape(), 'test_events_total{kind="a"} 3')
+
+    async def test_a_failed_push_keeps_the_values(self) -> None:
+        self.counter.inc(2, kind="a")
+        self.redis.down = True
+        with self.assertRaises(RedisError):
+            await metrics.apush_metrics(self.client)
+
+        self.redis.down = False
+        await metrics.apush_metrics(self.client)
+        self.assertEqual(await self.scrape(), 'test_events_total{kind="a"} 2')
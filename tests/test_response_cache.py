@@ -0,0 +1,126 @@
+import unittest
+from unittest import mock
+from uuid import uuid4
+
+from fastapi import Request
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.utils import response_cache
+from app.utils.response_cache import ResponseCache, bump_version
+
+
+class FakeRedis:
+    """The few commands the response cache uses, with writes that can fail."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+        self.fail_bumps = False
+        self.fail_deletes = False
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        return [self.data.get(key) for key in keys]
+
+    async def get(self, key: str) -> str | None:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: object, nx: bool = False, **kwargs) -> None:
+        if not (nx and key in self.data):
+            self.data[key] = str(value)
+
+    async def delete(self, key: str) -> None:
+        if self.fail_deletes:
+            raise RedisError("delete failed")
+        self.data.pop(key, None)
+
+    def pipeline(self) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    def set(self, *args, **kwargs) -> None:
+        pass
+
+    def incr(self, key: str) -> None:
+        self.key = key
+
+    def expire(self, *args) -> None:
+        pass
+
+    async def execute(self) -> None:
+        if self.redis.fail_bumps:
+            raise RedisError("bump failed")
+        self.redis.data[self.key] = str(int(self.redis.data[self.key]) + 1)
+
+
+def make_request(if_none_match: str | None = None) -> Request:
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/workouts/",
+            "query_string": b"",
+            "headers": headers,
+        }
+    )
+
+
+class ReadAfterFailedWriteTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        self.user_id = uuid4()
+        for patcher in (
+            mock.patch.object(settings, "RESPONSE_CACHE", "redis"),
+            mock.patch.object(settings, "RESPONSE_CACHE_BODIES", "off"),
+            mock.patch.object(
+                response_cache, "get_async_redis", return_value=self.redis
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(response_cache._uncacheable.clear)
+
+    async def etag_before_write(self) -> str:
+        cache = ResponseCache(make_request(), self.user_id)
+        self.assertIsNone(await cache.lookup())
+        assert cache.etag is not None
+
+        cached = await ResponseCache(make_request(cache.etag), self.user_id).lookup()
+        assert cached is not None
+        self.assertEqual(cached.status_code, 304)
+        return cache.etag
+
+    async def test_read_after_a_write_that_could_not_bump_the_version(self) -> None:
+        etag = await self.etag_before_write()
+
+        self.redis.fail_bumps = True
+        with self.assertLogs("app.utils.response_cache", "WARNING"):
+            await bump_version(self.user_id)
+
+        cache = ResponseCache(make_request(etag), self.user_id)
+        self.assertIsNone(await cache.lookup())
+        self.assertNotEqual(cache.etag, etag)
+
+    async def test_read_after_a_write_with_redis_unreachable(self) -> None:
+        etag = await self.etag_before_write()
+
+        self.redis.fail_bumps = self.redis.fail_deletes = True
+        with self.assertLogs("app.utils.response_cache", "ERROR"):
+            await bump_version(self.user_id)
+        self.redis.fail_bumps = self.redis.fail_deletes = False
+
+        cache = ResponseCache(make_request(etag), self.user_id)
+        self.assertIsNone(await cache.lookup())
+        self.assertIsNone(cache.etag)
@@ -0,0 +1,38 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy import text
+
+from app.core.database import aget_db, get_engine
+from app.core.redis import get_async_redis
+from app.tasks import run_shard
+
+
+class RunShardTest(unittest.TestCase):
+    def setUp(self) -> None:
+        for name in ("LeaseLock", "ShardProgress", "ShardCheckpoint"):
+            patcher = mock.patch(f"app.tasks.{name}")
+            self.addCleanup(patcher.stop)
+            setattr(self, name, patcher.start())
+        self.ShardCheckpoint.return_value.is_complete.return_value = False
+        self.ShardCheckpoint.return_value.get.return_value = None
+
+    def test_shards_in_one_process_do_not_share_connections(self) -> None:
+        clients = []
+
+        async def job(after_user_id, before_user_id, on_batch_done) -> None:
+            async for session in aget_db():
+                await session.execute(text("SELECT 1"))
+            clients.append(get_async_redis())
+            self.assertEqual(get_engine().sync_engine.pool.checkedin(), 1)
+
+        task = SimpleNamespace(name="test_task")
+        run_shard(task, "run", 0, 2, job)
+        self.assertEqual(get_engine().sync_engine.pool.checkedin(), 0)
+        run_shard(task, "run", 1, 2, job)
+
+        self.assertEqual(len(clients), 2)
+        self.assertIsNot(clients[0], clients[1])
+        self.assertEqual(get_engine().sync_engine.pool.checkedin(), 0)
+        self.LeaseLock.return_value.release.assert_called()
@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import cast
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import async_session, get_engine
+from app.crud import workouts as workout_crud
+from app.models.base import Base
+from app.models.goals import Goal
+from app.models.users import User
+from app.models.workouts import Workout
+from app.schemas.workouts import WorkoutExportQuery
+
+UTC_NOON = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def session_on(dialect: str) -> AsyncSession:
+    bind = SimpleNamespace(dialect=SimpleNamespace(name=dialect))
+    return cast(AsyncSession, SimpleNamespace(bind=bind))
+
+
+class WorkoutExportQueryTest(unittest.TestCase):
+    def test_dates_are_utc(self) -> None:
+        query = WorkoutExportQuery.model_validate(
+            {"start_date": "2026-01-01T17:00:00+05:00", "end_date": "2026-01-01T12:00"}
+        )
+        self.assertEqual(query.start_date, UTC_NOON)
+        self.assertEqual(query.end_date, UTC_NOON)
+
+    def test_reversed_range_is_rejected(self) -> None:
+        with self.assertRaises(ValidationError):
+            WorkoutExportQuery.model_validate(
+                {"start_date": "2026-01-02T00:00Z", "end_date": "2026-01-01T00:00Z"}
+            )
+
+
+class TimestampParamTest(unittest.TestCase):
+    def test_postgresql_keeps_the_offset(self) -> None:
+        # asyncpg would read a naive value as the server's local time
+        value = workout_crud.timestamp_param(session_on("postgresql"), UTC_NOON)
+        self.assertEqual(value.tzinfo, timezone.utc)
+
+    def test_sqlite_compares_naive_utc(self) -> None:
+        value = UTC_NOON.astimezone(timezone(timedelta(hours=-5)))
+        self.assertEqual(
+            workout_crud.timestamp_param(session_on("sqlite"), value),
+            datetime(2026, 1, 1, 12),
+        )
+
+
+class StreamWorkoutsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        async with get_engine().begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+        self.session = async_session(bind=get_engine())
+        self.addAsyncCleanup(self.session.close)
+        self.user = User(
+            first_name="a", last_name="b", email="export@example.com", password="x"
+        )
+        goal = Goal(
+            user=self.user,
+            target_exercise="running",
+            target_duration=30,
+            target_calories=1000,
+            deadline=UTC_NOON + timedelta(days=30),
+        )
+        self.session.add(
+            Workout(
+                user=self.user,
+                goal=goal,
+                exercise="running",
+                duration=30,
+                calories_burned=200,
+                created_at=UTC_NOON,
+            )
+        )
+        await self.session.commit()
+
+    async def test_range_with_an_offset(self) -> None:
+        for hours in (5, -5):
+            offset = timezone(timedelta(hours=hours))
+            query = WorkoutExportQuery(
+                start_date=(UTC_NOON - timedelta(minutes=1)).astimezone(offset),
+                end_date=(UTC_NOON + timedelta(minutes=1)).astimezone(offset),
+            )
+            rows = workout_crud.stream_workouts(
+                self.session, self.user, "", query.start_date, query.end_date
+            )
+            self.assertEqual(len([row async for row in rows]), 1, hours)